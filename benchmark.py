@@ -0,0 +1,466 @@
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import threading
+import contextlib
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+import main
+
+"""
+OSCPI benchmark with a local stand-in VRChat client
+
+python benchmark.py [--sizes 10 100 1000 10000] [--out result.json]
+
+every scenario runs in a temporary directory, config / sheets of the real OSCPI are never touched.
+result is written as json (stdout when --out is not given), OSCPI's own console output is discarded.
+"""
+
+
+def make_tree(_n: int, _group: int = 50) -> dict:
+    """
+    build avatar parameter tree like VRChat's /avatar/parameters
+    :param _n: (Int) number of parameters
+    :param _group: (Int) parameters per sub node
+    :return: (Dictionary) parameter tree
+    """
+    root = {"FULL_PATH": "/avatar/parameters", "ACCESS": 0, "CONTENTS": dict()}
+
+    for i in range(_n):
+        group = f"Bench{i // _group}"
+        node = root["CONTENTS"].setdefault(group, {"FULL_PATH": f"/avatar/parameters/{group}", "ACCESS": 0, "CONTENTS": dict()})
+        t = "ifT"[i % 3]
+        value = [0] if t == 'i' else [0.0] if t == 'f' else [False]
+        node["CONTENTS"][f"P{i}"] = {"FULL_PATH": f"/avatar/parameters/{group}/P{i}", "ACCESS": 3, "TYPE": t, "VALUE": value}
+
+    return root
+
+
+class FakeVRChat:
+    def __init__(self, _root: str):
+        """
+        Stand-in VRChat client: OSCQuery http server and OSC avatar config files.
+        :param _root: (String) directory of the fake VRChat OSC folder
+        """
+        self.osc_path = os.path.join(_root, "OSC")
+        self.avatars: dict = dict()
+        self.current: str = None
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/HOST_INFO'):
+                    body = json.dumps({"NAME": "VRChat-Client-Bench", "OSC_PORT": 9000}).encode()
+                elif self.path.startswith('/avatar/change'):
+                    body = json.dumps({"FULL_PATH": "/avatar/change", "TYPE": "s", "VALUE": [fake.current]}).encode()
+                elif self.path.startswith('/avatar/parameters'):
+                    body = fake.avatars[fake.current]
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def add_avatar(self, _avatar_id: str, _name: str, _n: int):
+        """
+        add avatar with generated parameter tree
+        :param _avatar_id: (String) avatar id
+        :param _name: (String) avatar name
+        :param _n: (Int) number of parameters
+        :return: NONE
+        """
+        self.avatars[_avatar_id] = json.dumps(make_tree(_n)).encode()
+
+        path = os.path.join(self.osc_path, "usr_bench", "Avatars")
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, _avatar_id + ".json"), 'w', encoding='utf-8') as f:
+            json.dump({"id": _avatar_id, "name": _name}, f)
+
+        if self.current is None:
+            self.current = _avatar_id
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class UdpSink:
+    def __init__(self):
+        """
+        Count OSC datagrams that OSCPI sends (stand-in VRChat OSC input port)
+        """
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+        self.socket.bind(('127.0.0.1', 0))
+        self.socket.settimeout(0.2)
+        self.port = self.socket.getsockname()[1]
+        self.count = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def __run(self):
+        while self.running:
+            try:
+                self.socket.recv(65536)
+                self.count += 1
+            except socket.timeout:
+                pass
+            except OSError:
+                return
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        self.socket.close()
+
+
+class UdpSource:
+    def __init__(self, _port: int, _names: list):
+        """
+        Send parameter changes to OSCPI like VRChat does (stand-in VRChat OSC output)
+        :param _port: (Int) OSC port of OSCPI
+        :param _names: (List) parameter names of the sheet
+        """
+        self.address = ('127.0.0.1', _port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+        rand = random.Random(0)
+        self.packets = list()
+        for k in range(min(len(_names), 1000)):
+            builder = OscMessageBuilder("/avatar/parameters/" + rand.choice(_names))
+            builder.add_arg(rand.random())
+            self.packets.append(builder.build().dgram)
+
+    def send(self, _count: int, _rate: float = None):
+        """
+        send parameter changes
+        :param _count: (Int) number of messages
+        :param _rate: (Optional) messages per second, as fast as possible when None
+        :return: NONE
+        """
+        started = time.perf_counter()
+        for k in range(_count):
+            self.socket.sendto(self.packets[k % len(self.packets)], self.address)
+            if _rate is not None:
+                delay = started + (k + 1) / _rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def close(self):
+        self.socket.close()
+
+
+def summary(_samples: list) -> dict:
+    return {
+        "min": min(_samples),
+        "median": statistics.median(_samples),
+        "max": max(_samples),
+        "runs": len(_samples)
+    }
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Bench:
+    def __init__(self, _root: str, _n: int, _repeat: int):
+        """
+        One parameter count: fake VRChat with two avatars, one VRChatClient set up like add_client() does
+        :param _root: (String) working directory
+        :param _n: (Int) number of parameters per avatar
+        :param _repeat: (Int) runs of each timed scenario
+        """
+        self.root = _root
+        self.n = _n
+        self.repeat = _repeat
+
+        self.vrchat = FakeVRChat(_root)
+        self.vrchat.add_avatar("avtr_bench_a", f"bench_a_{_n}", _n)
+        self.vrchat.add_avatar("avtr_bench_b", f"bench_b_{_n}", _n)
+        self.sink = UdpSink()
+
+        main.config = main.Config()
+        main.config.sheet_path = os.path.join(_root, "sheets")
+        main.config.blacklist_path = os.path.join(_root, "blacklist.csv")
+        main.config.avatar_index_path = os.path.join(_root, "avatar_index.json")
+        main.config.pacing = False
+        main.config.frame_interval = 0.0
+
+        self.client = main.VRChatClient("VRChat-Client-Bench", self.vrchat.port)
+        main.clients = {self.client.port: self.client}
+
+        avatar_config = main.AvatarConfig.__new__(main.AvatarConfig)
+        avatar_config.client = self.client
+        avatar_config.index = main.AvatarIndex(self.vrchat.osc_path, main.config.avatar_index_path)
+        avatar_config.update(self.client.get_current_avatar())
+        self.client.avatar_config = avatar_config
+
+        self.client.sender = main.Sender("127.0.0.1", self.sink.port, main.config.bundle)
+
+    def close(self):
+        self.sink.close()
+        self.vrchat.close()
+
+    def sheet_io(self) -> dict:
+        """
+        sheet create / load / save (csv and binary)
+        :return: (Dictionary) seconds of each operation
+        """
+        name = self.client.avatar_config.avatar_name
+        prmt = self.client.avatar_config.avatar_prmt
+        path = main.config.sheet_path
+        result = dict()
+
+        create, load = list(), list()
+        for _ in range(self.repeat):
+            shutil.rmtree(path, ignore_errors=True)
+            started = time.perf_counter()
+            main.DataSheet(name, path, prmt)
+            create.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            sheet = main.DataSheet(name, path, prmt)
+            load.append(time.perf_counter() - started)
+        result["create_csv"] = summary(create)
+        result["load_csv"] = summary(load)
+
+        save = list()
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            sheet.save(name, path)
+            save.append(time.perf_counter() - started)
+        result["save_csv"] = summary(save)
+
+        main.config.sheet_format = 'binary'
+        sheet.save(name, path)
+        load, save = list(), list()
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            sheet = main.DataSheet(name, path, prmt)
+            load.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            sheet.save(name, path)
+            save.append(time.perf_counter() - started)
+        main.config.sheet_format = 'csv'
+        result["load_binary"] = summary(load)
+        result["save_binary"] = summary(save)
+
+        self.client.sheet = main.DataSheet(name, path, prmt)
+        result["parameters"] = len(self.client.sheet.store)
+        return result
+
+    def setup_loop(self):
+        client = self.client
+        client.schedulers = [main.Scheduler(client.sheet, k, client.name) for k in range(main.config.lane_count())]
+        client.pacers = [main.Pacer() for _ in range(main.config.lane_count())]
+        client.switcher = main.AvatarSwitcher(client)
+        client.router = main.Receiver.build_dispatcher(client)
+        return client.router
+
+    async def inbound(self, _count: int) -> dict:
+        """
+        inbound handler throughput, dispatcher only and through a real UDP socket
+        :param _count: (Int) number of messages
+        :return: (Dictionary) messages per second
+        """
+        d = self.setup_loop()
+        source = UdpSource(0, self.client.sheet.store.names)
+        result = dict()
+
+        samples = list()
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            for k in range(_count):
+                d.call_fast(source.packets[k % len(source.packets)], ('127.0.0.1', 0))
+            samples.append(_count / (time.perf_counter() - started))
+        result["dispatch_per_s"] = summary(samples)
+
+        # built-in parameters that are not in the sheet (VRChat sends them all the time)
+        builder = OscMessageBuilder("/avatar/parameters/VelocityX")
+        builder.add_arg(0.5)
+        irrelevant = builder.build().dgram
+        samples = list()
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            for k in range(_count):
+                d.call_fast(irrelevant, ('127.0.0.1', 0))
+            samples.append(_count / (time.perf_counter() - started))
+        result["drop_per_s"] = summary(samples)
+
+        port = free_port()
+        receiver = main.Receiver('127.0.0.1', port)
+        transport = await receiver.start()
+        source.address = ('127.0.0.1', port)
+
+        counter = main.metrics.messages_received
+        before = sum(counter.values.values())
+        started = time.perf_counter()
+        sending = asyncio.get_running_loop().run_in_executor(None, source.send, _count)
+
+        # wait until every message is handled or nothing arrives anymore
+        last, idle = before, 0
+        while idle < 5:
+            await asyncio.sleep(0.02)
+            now = sum(counter.values.values())
+            if now - before >= _count:
+                break
+            idle = idle + 1 if now == last and sending.done() else 0
+            last = now
+        elapsed = time.perf_counter() - started
+        await sending
+
+        received = sum(counter.values.values()) - before
+        result["udp_per_s"] = received / elapsed
+        result["udp_loss"] = 1 - received / _count
+
+        transport.close()
+        source.close()
+        return result
+
+    async def send_loop(self, _duration: float) -> dict:
+        """
+        send loop frames per second, every frame is kept due so the loop never waits
+        :param _duration: (Float) seconds to run
+        :return: (Dictionary) frames per second, cycle time
+        """
+        main.config.keepalive_hot = main.config.keepalive_normal = main.config.keepalive_cold = 0.0
+        self.setup_loop()
+
+        frames = main.metrics.frames_sent
+        before = sum(frames.values.values())
+        received = self.sink.count
+
+        tasks = [asyncio.ensure_future(main.loop(self.client, PRINT_INFO=False, _lane=k))
+                 for k in range(len(self.client.schedulers))]
+        await asyncio.sleep(_duration)
+        for task in tasks:
+            task.cancel()
+        await asyncio.sleep(0.2)
+
+        main.config.keepalive_hot, main.config.keepalive_normal, main.config.keepalive_cold = 1.0, 5.0, 30.0
+
+        sent = sum(frames.values.values()) - before
+        units = sum(len(s.classes) for s in self.client.schedulers)
+        fps = sent / _duration
+        return {
+            "frames_per_s": fps,
+            "frames": sent,
+            "datagrams_received": self.sink.count - received,
+            "frame_units": units,
+            "cycle_s": units / fps if fps else None
+        }
+
+    async def avatar_switch(self) -> dict:
+        """
+        avatar switch latency, first switch creates the sheet, later ones hit the avatar cache
+        :return: (Dictionary) seconds until new sheet is active and until every value has been re-sent
+        """
+        self.setup_loop()
+        histogram = main.metrics.avatar_change
+
+        def swapped() -> float:
+            return sum(h[-1] for h in histogram.values.values())
+
+        async def switch(_avatar_id: str) -> tuple:
+            self.vrchat.current = _avatar_id
+            before = swapped()
+            started = time.perf_counter()
+            main.Receiver.avatar_change_handler(self.client, "/avatar/change", _avatar_id)
+            await self.client.switcher.task
+            return swapped() - before, time.perf_counter() - started
+
+        cold = await switch("avtr_bench_b")
+        cached, total = list(), list()
+        for k in range(self.repeat):
+            swap, done = await switch("avtr_bench_a" if k % 2 == 0 else "avtr_bench_b")
+            cached.append(swap)
+            total.append(done)
+
+        return {
+            "cold_swap_s": cold[0],
+            "cold_total_s": cold[1],
+            "cached_swap_s": summary(cached),
+            "cached_total_s": summary(total)
+        }
+
+    async def run(self, _duration: float) -> dict:
+        writer = self.client.sender.start()
+
+        result = {"size": self.n}
+        result["sheet_io"] = self.sheet_io()
+        result["inbound"] = await self.inbound(max(10000, self.n))
+        result["send_loop"] = await self.send_loop(_duration)
+        result["avatar_switch"] = await self.avatar_switch()
+
+        writer.cancel()
+        return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=f"OSC Parameter Increaser {main.Version} benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000], help="parameters per avatar")
+    parser.add_argument('--repeat', type=int, default=5, help="runs of each timed scenario")
+    parser.add_argument('--duration', type=float, default=2.0, help="seconds of send loop scenario")
+    parser.add_argument('--out', help="json result file (stdout if not given)")
+    args = parser.parse_args()
+
+    results = list()
+    for n in args.sizes:
+        root = tempfile.mkdtemp(prefix="oscpi_bench_")
+        cwd = os.getcwd()
+        try:
+            os.chdir(root)
+            print(f"benchmark {n} parameters", file=sys.stderr)
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                bench = Bench(root, n, args.repeat)
+                try:
+                    results.append(asyncio.run(bench.run(args.duration)))
+                finally:
+                    bench.close()
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "version": main.Version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out is None:
+        print(text)
+    else:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
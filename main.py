@@ -1,17 +1,35 @@
 import os
+import sys
+import mmap
+import argparse
 import asyncio
 import json
 import csv
 import errno
 import socket
 import time
+import heapq
+import concurrent.futures
+import threading
+import functools
+import struct
+import bisect
+import queue
+import atexit
+import logging
+import logging.handlers
 import psutil
 
 import requests
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import Mapping
 from enum import Enum
-from pythonosc import udp_client, osc_server, dispatcher
-from tinyoscquery.query import OSCQueryBrowser, OSCQueryClient
+from pythonosc import udp_client, dispatcher, osc_message, osc_message_builder
+from zeroconf import Zeroconf
+from tinyoscquery.query import OSCQueryBrowser
 from tinyoscquery.queryservice import OSCQueryService, OSCAccess
+from sharedtable import SharedTable
 
 """
 버전코드 설명
@@ -33,6 +51,169 @@ class Flag(Enum):
     Info = "\033[34m[INFO]\033[0m "
     Debug = "\033[32m[Debug]\033[0m "
     Warn = "\033[33m[Warning]\033[0m "
+    Error = "\033[31m[Error]\033[0m "
+
+
+class FlagFormatter(logging.Formatter):
+    FLAGS = {
+        logging.DEBUG: Flag.Debug,
+        logging.INFO: Flag.Info,
+        logging.WARNING: Flag.Warn,
+        logging.ERROR: Flag.Error,
+        logging.CRITICAL: Flag.Error
+    }
+
+    def format(self, record: logging.LogRecord) -> str:
+        flag = FlagFormatter.FLAGS.get(record.levelno, Flag.Info)
+        return flag.value + super().format(record)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # message is formatted by the writer thread, not by the caller
+        return record
+
+
+def start_logging() -> logging.handlers.QueueListener:
+    """
+    route OSCPI log records through a queue to a console writer thread
+    :return: (QueueListener) writer, stopped at exit
+    """
+    records = queue.SimpleQueue()
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(FlagFormatter("%(message)s"))
+
+    log.addHandler(LazyQueueHandler(records))
+    log.propagate = False
+    # until config is loaded, messages of Config itself are shown
+    log.setLevel(logging.INFO)
+
+    listener = logging.handlers.QueueListener(records, console)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+log = logging.getLogger("OSCPI")
+
+
+class RefreshClass(Enum):
+    Hot = "Hot"
+    Normal = "Normal"
+    Cold = "Cold"
+
+
+class Counter:
+    TYPE = 'counter'
+
+    def __init__(self, _name: str, _help: str, _labels: tuple = ()):
+        """
+        Monotonic counter, one value per label values
+        :param _name: (String) metric name
+        :param _help: (String) description
+        :param _labels: (Tuple) label names
+        """
+        self.name = _name
+        self.help = _help
+        self.labels = _labels
+        self.values: dict = dict()
+
+    def inc(self, _n=1, _labels: tuple = ()):
+        self.values[_labels] = self.values.get(_labels, 0) + _n
+
+    def samples(self):
+        """
+        :return: (Generator) (name suffix, label values, extra labels, value)
+        """
+        for labels, value in list(self.values.items()):
+            yield '', labels, '', value
+
+
+class Gauge(Counter):
+    TYPE = 'gauge'
+
+    def set(self, _value, _labels: tuple = ()):
+        self.values[_labels] = _value
+
+
+class Histogram(Counter):
+    TYPE = 'histogram'
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, _name: str, _help: str, _labels: tuple = (), _buckets: tuple = BUCKETS):
+        """
+        Distribution of observed values in cumulative buckets (seconds by default)
+        :param _buckets: (Optional) upper bounds of buckets
+        """
+        super().__init__(_name, _help, _labels)
+        self.buckets = _buckets
+
+    def observe(self, _value: float, _labels: tuple = ()):
+        # [bucket counts..., +Inf count, sum]
+        h = self.values.get(_labels)
+        if h is None:
+            h = self.values[_labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        h[bisect.bisect_left(self.buckets, _value)] += 1
+        h[-1] += _value
+
+    def samples(self):
+        for labels, h in list(self.values.items()):
+            h = list(h)
+            total = 0
+            for bound, n in zip(self.buckets + (float('inf'),), h):
+                total += n
+                yield '_bucket', labels, 'le="{}"'.format('+Inf' if bound == float('inf') else bound), total
+            yield '_sum', labels, '', h[-1]
+            yield '_count', labels, '', total
+
+
+class Metrics:
+    def __init__(self):
+        """
+        Counters, gauges and histograms of OSCPI, read in Prometheus text format by render().
+
+        collecting a value is one dict update, rendering runs on the http server thread.
+        """
+        self.registry: list = list()
+
+        self.frames_sent = self.add(Counter('oscpi_frames_sent_total', "sync frames sent", ('client', 'lane')))
+        self.messages_received = self.add(Counter('oscpi_messages_received_total', "OSC messages received", ('routed',)))
+        self.frame_staleness = self.add(Histogram('oscpi_frame_staleness_seconds', "time between two frames of the same parameter", ('client', 'lane')))
+        self.cycle_time = self.add(Gauge('oscpi_cycle_seconds', "time until every frame of the lane has been sent once", ('client', 'lane')))
+        self.pacing_interval = self.add(Gauge('oscpi_pacing_interval_seconds', "current frame interval", ('client', 'lane')))
+        self.pacing_rtt = self.add(Gauge('oscpi_pacing_rtt_seconds', "smoothed echo round trip", ('client', 'lane')))
+        self.loop_lag = self.add(Histogram('oscpi_event_loop_lag_seconds', "event loop lag"))
+        self.avatar_change = self.add(Histogram('oscpi_avatar_change_seconds', "avatar change handling, until new sheet is active"))
+        self.handler_time = self.add(Histogram('oscpi_handler_seconds', "time spent in receiver handlers", ('handler',)))
+        self.sheet_io = self.add(Histogram('oscpi_sheet_io_seconds', "sheet load / save / journal flush", ('op',)))
+        self.parameters = self.add(Gauge('oscpi_parameters', "parameters in current sheet", ('client',)))
+        self.send_queue_depth = self.add(Gauge('oscpi_send_queue_depth', "frames / messages waiting for the writer"))
+        self.send_queue_dropped = self.add(Counter('oscpi_send_queue_dropped_total', "queued items replaced or dropped", ('reason',)))
+
+    def add(self, _metric):
+        self.registry.append(_metric)
+        return _metric
+
+    def render(self) -> tuple:
+        """
+        render every metric, this is the route callback of the OSCQuery http server
+        :return: (Tuple) content type, Prometheus text exposition
+        """
+        lines = list()
+        for m in self.registry:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.TYPE}")
+            for suffix, labels, extra, value in m.samples():
+                pairs = ['{}="{}"'.format(k, v) for k, v in zip(m.labels, labels)]
+                if extra:
+                    pairs.append(extra)
+                lines.append("{}{}{} {}".format(m.name, suffix, "{" + ",".join(pairs) + "}" if pairs else "", value))
+
+        return "text/plain; version=0.0.4", "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
 
 
 class OSCQuery:
@@ -53,61 +234,222 @@ class OSCQuery:
     def __init__(self):
         self.http_port: int = 0
         self.osc_port: int = 0
-        self.vrchat_client_port = None
-
+        self.browser: OSCQueryBrowser = None
+
+        # every VRChat client found so far, OSCQuery port -> service name
+        self.clients: dict = dict()
+        # service name -> OSCQuery port, to tell which client a removed service was
+        self.names: dict = dict()
+        self.lock = threading.Lock()
+        # (event loop, added, removed) callbacks set by watch()
+        self.watcher: tuple = None
+        # resolved from zeroconf thread as soon as first VRChat service shows up
+        self.ready: concurrent.futures.Future = concurrent.futures.Future()
+
+        # one zeroconf instance for advertising and browsing
+        self.zeroconf = Zeroconf()
+
+        session = dict()
+        if config.fast_start:
+            session = OSCQuery.__load_session()
+
+        # find free udp port and set osc_port (last one if it is still free)
+        self.__get_free_udp_port(session.get('osc_port', 0))
+        # find free tcp port and set http_port (last one if it is still free)
+        self.__get_free_tcp_port(session.get('http_port', 0))
+
+        # zeroconf registration takes seconds of probing, VRChat is discovered meanwhile
+        self.oscQueryService: OSCQueryService = None
+        self.advertise_thread = threading.Thread(target=self.__advertise, daemon=True)
+        self.advertise_thread.start()
+
+        # session of older version has only one port
+        ports = session.get('vrchat_ports', [session['vrchat_port']] if 'vrchat_port' in session else [])
+        for port in ports:
+            if OSCQuery.__probe(port):
+                self.clients[port] = "VRChat-Client"
+                log.info("VRChat port reused: %s", port)
+
+        # keeps running, VRChat clients that start later are found too
+        self.browser = OSCQueryBrowser(self.__on_service, zeroconf=self.zeroconf, removed=self.__on_removed)
+
+        if not self.clients:
+            self.__discover()
+
+        if config.fast_start:
+            self.__save_session()
+
+    def __discover(self):
+        """
+        (PRIVATE) wait until first VRChat OSCQuery service has been found with zeroconf
+        :return: NONE
+        """
+        # discovery below waits for VRChat anyway, this is only for the message
         if not OSCQuery.__check_process_is_running():
-            print("VRC isn't running waiting...")
-            while(not OSCQuery.__check_process_is_running()):
-                time.sleep(1)
+            log.info("VRC isn't running waiting...")
+
+        try:
+            self.ready.result(timeout=config.discovery_timeout)
+        except concurrent.futures.TimeoutError:
+            raise TimeoutError(f"VRChat OSCQuery service has not been found in {config.discovery_timeout} seconds. "
+                               "check that VRChat is running and OSC is enabled.")
+
+    @staticmethod
+    def __probe(_port: int) -> bool:
+        """
+        (PRIVATE STATIC) check that VRChat OSCQuery service still answers on port
+        :param _port: (Int) last known VRChat OSCQuery port
+        :return: (Bool) result
+        """
+        try:
+            response = requests.get(f"http://127.0.0.1:{_port}/HOST_INFO", timeout=0.5)
+            if response.status_code != 200:
+                return False
+            return 'VRChat-Client' in response.json()['NAME']
+        except (requests.RequestException, ValueError, KeyError, TypeError):
+            return False
+
+    @staticmethod
+    def __load_session() -> dict:
+        """
+        (PRIVATE STATIC) load ports of last run
+        :return: (Dictionary) session, empty if there's no session file
+        """
+        try:
+            with open(config.session_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return dict()
+
+    def __save_session(self) -> int:
+        """
+        (PRIVATE) save ports of this run for fast start
+        :return: (Int) errno more information see this page https://docs.python.org/3/library/errno.html
+        """
+        with self.lock:
+            ports = list(self.clients)
+
+        session = {
+            "vrchat_ports": ports,
+            "osc_port": self.osc_port,
+            "http_port": self.http_port
+        }
 
-        # find free udp port and set osc_port
-        self.__get_free_udp_port()
-        # find free tcp port and set http_port
-        self.__get_free_tcp_port()
+        try:
+            with open(config.session_path, 'w', encoding='utf-8') as f:
+                json.dump(session, f, indent=4)
+        except IOError as e:
+            return e.errno
+        return 0
+
+    def __advertise(self):
+        """
+        (PRIVATE) start OSCQuery service of OSCPI and advertise it
+        :return: NONE
+        """
+        service = OSCQueryService("OSC Parameter Increaser", self.http_port, self.osc_port, zeroconf=self.zeroconf)
+        service.advertise_endpoint("/avatar/parameters/MuteSelf", False, OSCAccess.WRITEONLY_VALUE)
+        if config.metrics:
+            service.add_route("/metrics", metrics.render)
 
-        self.oscQueryService = OSCQueryService("OSC Parameter Increaser", self.http_port, self.osc_port)
-        self.oscQueryService.advertise_endpoint("/avatar/parameters/MuteSelf", False, OSCAccess.WRITEONLY_VALUE)
+        self.oscQueryService = service
+        log.info("OSCQuery service has been advertised")
 
-        self.browser = OSCQueryBrowser()
-        # wait for discovery
-        time.sleep(2)
+    def __on_service(self, _type: str, _name: str, _service_info):
+        """
+        (PRIVATE) zeroconf callback, add VRChat client when its OSCQuery service is found
+        :param _type: (String) service type
+        :param _name: (String) service name
+        :param _service_info: (ServiceInfo) resolved service
+        :return: NONE
+        """
+        if _type != '_oscjson._tcp.local.' or 'VRChat-Client' not in _name:
+            return
+
+        port = _service_info.port
+        with self.lock:
+            self.names[_name] = port
+            if port in self.clients:
+                # reused from session or announced again
+                self.clients[port] = _name
+                return
+            self.clients[port] = _name
+            watcher = self.watcher
+
+        log.info("VRChat port found: %s (%s)", port, _name)
+        if not self.ready.done():
+            self.ready.set_result(port)
+        if watcher is not None:
+            watcher[0].call_soon_threadsafe(watcher[1], port, _name)
+        if config.fast_start:
+            self.__save_session()
+
+    def __on_removed(self, _type: str, _name: str):
+        """
+        (PRIVATE) zeroconf callback, remove VRChat client when its OSCQuery service has gone
+        :param _type: (String) service type
+        :param _name: (String) service name
+        :return: NONE
+        """
+        if _type != '_oscjson._tcp.local.':
+            return
 
-        while self.vrchat_client_port is None:
-            for service_info in self.browser.get_discovered_oscquery():
-                client = OSCQueryClient(service_info)
+        with self.lock:
+            port = self.names.pop(_name, None)
+            if port is None or self.clients.pop(port, None) is None:
+                return
+            watcher = self.watcher
 
-                if 'VRChat-Client' in client.service_info.name:
-                    self.vrchat_client_port = client.service_info.port
-                    print(Flag.Info.value + f"VRChat port found: {self.vrchat_client_port}")
+        log.info("VRChat client has gone: %s (%s)", port, _name)
+        if watcher is not None:
+            watcher[0].call_soon_threadsafe(watcher[2], port)
 
-                time.sleep(1)
+    def watch(self, _loop: asyncio.AbstractEventLoop, _added, _removed) -> dict:
+        """
+        report VRChat clients that are found or gone from now on, callbacks run on the event loop
+        :param _loop: (AbstractEventLoop) event loop to call callbacks in
+        :param _added: (Callable) added(port, name)
+        :param _removed: (Callable) removed(port)
+        :return: (Dictionary) clients that have been found already, OSCQuery port -> service name
+        """
+        with self.lock:
+            self.watcher = (_loop, _added, _removed)
+            return dict(self.clients)
 
-    def __get_free_udp_port(self):
+    def __get_free_udp_port(self, _port: int = 0):
         """
         (PRIVATE) set udp port
+        :param _port: (Int) preferred port, any free port if it is 0 or in use
         :return: NONE
         """
 
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as udp_socket:
-            udp_socket.bind(('localhost', 0))
+            try:
+                udp_socket.bind(('localhost', _port))
+            except OSError:
+                udp_socket.bind(('localhost', 0))
             port = udp_socket.getsockname()[1]
 
             self.osc_port = port
 
-            print(Flag.Info.value + "getting UDP port has been completed")
+            log.info("getting UDP port has been completed")
 
-    def __get_free_tcp_port(self):
+    def __get_free_tcp_port(self, _port: int = 0):
         """
         (PRIVATE) set tcp port
+        :param _port: (Int) preferred port, any free port if it is 0 or in use
         :return: NONE
         """
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as tcp_socket:
-            tcp_socket.bind(('localhost', 0))
+            try:
+                tcp_socket.bind(('localhost', _port))
+            except OSError:
+                tcp_socket.bind(('localhost', 0))
             tcp_socket.listen(1)
             port = tcp_socket.getsockname()[1]
 
             self.http_port = port
-            print(Flag.Info.value + "getting TCP port has been completed")
+            log.info("getting TCP port has been completed")
 
     # <method that returns class variable>
     def get_osc_port(self) -> int:
@@ -123,42 +465,26 @@ class OSCQuery:
         :return: (Int) port number for http connection
         """
         return self.http_port
-
-    def get_current_avatar(self) -> str:
-        """
-        get current avatar id
-        :return: (String) Avatar ID
-        """
-
-        while True:
-            response = requests.get(f"http://127.0.0.1:{self.vrchat_client_port}/avatar/change")
-
-            if response.status_code == 200:
-                json_data = response.json()
-                return json_data['VALUE'][0]
-
-            time.sleep(1)
-
-    def get_avatar_prmt(self) -> dict:
-        """
-        get current avatar's parameters
-        :return: (Dictionary) parameters
-        """
-        response = requests.get(f"http://127.0.0.1:{self.vrchat_client_port}/avatar/parameters")
-
-        if response.status_code == 200:
-            prmt = response.json()
-            return prmt
     # </method that returns class variable>
 
 
 class Config:
-    CONFIG_VERSION = 3
+    CONFIG_VERSION = 4
+    FILE = "./config.json"
+    # (section, key) that are only read at startup, hot reload can't apply them
+    RESTART = (("NETWORK", "metrics"), ("FILES", "avatar_index_file"), ("FILES", "session_file"),
+               ("SHARED_MEMORY", "enabled"), ("SHARED_MEMORY", "name"), ("SHARED_MEMORY", "capacity"))
+    LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+    LANE_KEYS = ("prmt_id", "prmt_float", "prmt_int", "prmt_bool", "prmt_light")
 
     def __init__(self):
         # <NETWORK>
         self.ip_addr: str = "127.0.0.1"
         self.client_port: int = 9000
+        self.bundle: bool = False
+        self.discovery_timeout: float = 60.0
+        self.fast_start: bool = True
+        self.metrics: bool = True
         # </NETWORK>
 
         # <PARAMETERS>
@@ -171,18 +497,58 @@ class Config:
         self.prmt_reset: str = "OSCPI/reset"
 
         self.ignore_addr: list = ["FT", "OUT"]
+
+        self.bool_packing: bool = False
+        self.bool_group_base: int = 224
+
+        # additional sync lanes, lane 0 is the parameters above
+        # each lane: {"prmt_id", "prmt_float", "prmt_int", "prmt_bool", "prmt_light"}
+        self.lanes: list = list()
         # </PARAMETERS>
 
         # <FILES>
         self.sheet_path: str = "./sheets"
         self.blacklist_path: str = "./blacklist.csv"
+        self.journal_interval: float = 1.0
+        self.journal_compact: int = 500
+        self.avatar_index_path: str = "./avatar_index.json"
+        self.avatar_cache_size: int = 4
+        self.session_path: str = "./session.json"
+        self.sheet_format: str = "csv"
+        self.reload_interval: float = 1.0
         # </FILES>
 
+        # <SCHEDULER>
+        self.frame_interval: float = 0.1
+        self.keepalive_hot: float = 1.0
+        self.keepalive_normal: float = 5.0
+        self.keepalive_cold: float = 30.0
+        self.coalesce_window: float = 0.2
+        self.send_queue_size: int = 1024
+        self.pacing: bool = False
+        self.pacing_min: float = 0.02
+        self.pacing_max: float = 0.5
+        # </SCHEDULER>
+
+        # <LOGGING>
+        self.log_level: str = "INFO"
+        # </LOGGING>
+
+        # <SHARED_MEMORY>
+        self.shared_memory: bool = False
+        self.shared_memory_name: str = "oscpi"
+        self.shared_memory_capacity: int = 4096
+        self.shared_memory_interval: float = 0.02
+        # </SHARED_MEMORY>
+
+        # increased whenever values are (re)loaded, cached data built from config compares against it
+        self.revision: int = 0
+
         if self.load() == errno.ENOENT:
-            print(Flag.Info.value + "there's no config file. now create new one.")
+            log.info("there's no config file. now create new one.")
             self.save()
 
-    def load(self, _file: str = "./config.json") -> int:
+    def load(self, _file: str = FILE) -> int:
         """
         load config file
         :param _file: [optional] (String) file path that have setting value (json format)
@@ -194,6 +560,15 @@ class Config:
 
                 self.ip_addr = raw["NETWORK"]["ip"]
                 self.client_port = raw["NETWORK"]["client_port"]
+                # added in CONFIG_VERSION 4
+                if 'bundle' in raw["NETWORK"]:
+                    self.bundle = raw["NETWORK"]["bundle"]
+                if 'discovery_timeout' in raw["NETWORK"]:
+                    self.discovery_timeout = raw["NETWORK"]["discovery_timeout"]
+                if 'fast_start' in raw["NETWORK"]:
+                    self.fast_start = raw["NETWORK"]["fast_start"]
+                if 'metrics' in raw["NETWORK"]:
+                    self.metrics = raw["NETWORK"]["metrics"]
 
                 self.prmt_id = raw['PARAMETERS']['prmt_id']
                 self.prmt_float_out = raw['PARAMETERS']["prmt_float"]
@@ -204,17 +579,62 @@ class Config:
                 self.prmt_reset = raw['PARAMETERS']['prmt_reset']
 
                 self.ignore_addr = raw['PARAMETERS']['ignore_address']
+                # added in CONFIG_VERSION 4
+                if 'bool_packing' in raw['PARAMETERS']:
+                    self.bool_packing = raw['PARAMETERS']['bool_packing']
+                    self.bool_group_base = raw['PARAMETERS']['bool_group_base']
+                if 'lanes' in raw['PARAMETERS']:
+                    self.lanes = raw['PARAMETERS']['lanes']
 
                 self.sheet_path = raw['FILES']['sheet_directory']
                 self.blacklist_path = raw['FILES']['blacklist_file']
-
+                # added in CONFIG_VERSION 4
+                if 'journal_interval' in raw['FILES']:
+                    self.journal_interval = raw['FILES']['journal_interval']
+                    self.journal_compact = raw['FILES']['journal_compact']
+                if 'avatar_index_file' in raw['FILES']:
+                    self.avatar_index_path = raw['FILES']['avatar_index_file']
+                if 'avatar_cache_size' in raw['FILES']:
+                    self.avatar_cache_size = raw['FILES']['avatar_cache_size']
+                if 'session_file' in raw['FILES']:
+                    self.session_path = raw['FILES']['session_file']
+                if 'sheet_format' in raw['FILES']:
+                    self.sheet_format = raw['FILES']['sheet_format']
+                if 'reload_interval' in raw['FILES']:
+                    self.reload_interval = raw['FILES']['reload_interval']
+
+                # added in CONFIG_VERSION 4
+                if 'SCHEDULER' in raw:
+                    self.frame_interval = raw['SCHEDULER']['frame_interval']
+                    self.keepalive_hot = raw['SCHEDULER']['keepalive_hot']
+                    self.keepalive_normal = raw['SCHEDULER']['keepalive_normal']
+                    self.keepalive_cold = raw['SCHEDULER']['keepalive_cold']
+                    if 'coalesce_window' in raw['SCHEDULER']:
+                        self.coalesce_window = raw['SCHEDULER']['coalesce_window']
+                    if 'send_queue_size' in raw['SCHEDULER']:
+                        self.send_queue_size = raw['SCHEDULER']['send_queue_size']
+                    if 'pacing' in raw['SCHEDULER']:
+                        self.pacing = raw['SCHEDULER']['pacing']
+                        self.pacing_min = raw['SCHEDULER']['pacing_min']
+                        self.pacing_max = raw['SCHEDULER']['pacing_max']
+
+                # added in CONFIG_VERSION 4
+                if 'LOGGING' in raw:
+                    self.log_level = raw['LOGGING']['level']
+                if 'SHARED_MEMORY' in raw:
+                    self.shared_memory = raw['SHARED_MEMORY']['enabled']
+                    self.shared_memory_name = raw['SHARED_MEMORY']['name']
+                    self.shared_memory_capacity = raw['SHARED_MEMORY']['capacity']
+                    self.shared_memory_interval = raw['SHARED_MEMORY']['interval']
+
+                self.revision += 1
                 return 0
         except IOError as e:
             return e.errno
         except Exception as e:
             raise e
 
-    def save(self, _file: str = "./config.json") -> int:
+    def save(self, _file: str = FILE) -> int:
         """
         create or update config file
         :param _file: [optional] (String) file path that config file saved
@@ -224,12 +644,12 @@ class Config:
         try:
             with open(_file, "w", encoding='utf-8') as f:
                 f.write(self.tojson())
-                print(Flag.Info.value + '**CONFIG DATA SAVE COMPLETE**')
+                log.info('**CONFIG DATA SAVE COMPLETE**')
                 return 0
         except IOError as e:
             return e.errno
         except Exception as e:
-            print(e)
+            log.error("%s", e)
             raise e
 
     def tojson(self) -> str:
@@ -245,24 +665,64 @@ class Config:
             "prmt_bool": self.prmt_bool_out,
             "prmt_reset": self.prmt_reset,
             "prmt_light": self.prmt_out_light,
-            "ignore_address": self.ignore_addr
+            "ignore_address": self.ignore_addr,
+            "bool_packing": self.bool_packing,
+            "bool_group_base": self.bool_group_base,
+            "lanes": self.lanes
         }
 
         d_file = {
             "sheet_directory": self.sheet_path,
-            "blacklist_file": self.blacklist_path
+            "blacklist_file": self.blacklist_path,
+            "journal_interval": self.journal_interval,
+            "journal_compact": self.journal_compact,
+            "avatar_index_file": self.avatar_index_path,
+            "avatar_cache_size": self.avatar_cache_size,
+            "session_file": self.session_path,
+            "sheet_format": self.sheet_format,
+            "reload_interval": self.reload_interval
         }
 
         d_net = {
             "ip": self.ip_addr,
             "client_port": self.client_port,
+            "bundle": self.bundle,
+            "discovery_timeout": self.discovery_timeout,
+            "fast_start": self.fast_start,
+            "metrics": self.metrics
+        }
+
+        d_sched = {
+            "frame_interval": self.frame_interval,
+            "keepalive_hot": self.keepalive_hot,
+            "keepalive_normal": self.keepalive_normal,
+            "keepalive_cold": self.keepalive_cold,
+            "coalesce_window": self.coalesce_window,
+            "send_queue_size": self.send_queue_size,
+            "pacing": self.pacing,
+            "pacing_min": self.pacing_min,
+            "pacing_max": self.pacing_max
+        }
+
+        d_log = {
+            "level": self.log_level
+        }
+
+        d_shm = {
+            "enabled": self.shared_memory,
+            "name": self.shared_memory_name,
+            "capacity": self.shared_memory_capacity,
+            "interval": self.shared_memory_interval
         }
 
         result = {
             "CONFIG_VERSION": self.CONFIG_VERSION,
             "NETWORK": d_net,
             "PARAMETERS": d_prmt,
-            "FILES": d_file
+            "FILES": d_file,
+            "SCHEDULER": d_sched,
+            "LOGGING": d_log,
+            "SHARED_MEMORY": d_shm
         }
 
         return json.dumps(result, sort_keys=False, indent=4)
@@ -271,29 +731,284 @@ class Config:
         s_json: str = self.tojson()
         return json.loads(s_json)
 
+    def validate(self):
+        """
+        check loaded values before they are used, same at startup and reload
+
+        unknown log level only changes what is shown, INFO is used instead
+        :raise ValueError: value that can't be used, with its section and key
+        :return: NONE
+        """
+        if self.log_level not in Config.LOG_LEVELS:
+            log.warning("LOGGING.level %r is unknown, INFO is used (%s)", self.log_level, ", ".join(Config.LOG_LEVELS))
+            self.log_level = "INFO"
+
+        if not isinstance(self.lanes, list):
+            raise ValueError("PARAMETERS.lanes must be a list")
+        for k, lane in enumerate(self.lanes):
+            if not isinstance(lane, dict) or not all(isinstance(lane.get(key), str) for key in Config.LANE_KEYS):
+                raise ValueError(f"PARAMETERS.lanes[{k}] needs {', '.join(Config.LANE_KEYS)}")
+
+        for name, value in (("NETWORK.ip", self.ip_addr), ("PARAMETERS.prmt_id", self.prmt_id),
+                            ("PARAMETERS.prmt_float", self.prmt_float_out), ("PARAMETERS.prmt_int", self.prmt_int_out),
+                            ("PARAMETERS.prmt_bool", self.prmt_bool_out), ("PARAMETERS.prmt_light", self.prmt_out_light),
+                            ("PARAMETERS.prmt_reset", self.prmt_reset), ("FILES.sheet_directory", self.sheet_path),
+                            ("FILES.blacklist_file", self.blacklist_path), ("SHARED_MEMORY.name", self.shared_memory_name)):
+            if not isinstance(value, str):
+                raise ValueError(f"{name} must be a string")
+        if not isinstance(self.ignore_addr, list) or not all(isinstance(a, str) for a in self.ignore_addr):
+            raise ValueError("PARAMETERS.ignore_address must be a list of strings")
+        if self.sheet_format not in ('csv', 'binary'):
+            raise ValueError(f"FILES.sheet_format must be csv or binary, not {self.sheet_format!r}")
+
+        for name, value in (("NETWORK.bundle", self.bundle), ("NETWORK.fast_start", self.fast_start),
+                            ("NETWORK.metrics", self.metrics), ("PARAMETERS.bool_packing", self.bool_packing),
+                            ("SCHEDULER.pacing", self.pacing), ("SHARED_MEMORY.enabled", self.shared_memory)):
+            if not isinstance(value, bool):
+                raise ValueError(f"{name} must be true or false")
+
+        # (name, value, minimum, maximum)
+        for name, value, low, high in (("NETWORK.client_port", self.client_port, 1, 65535),
+                                       ("PARAMETERS.bool_group_base", self.bool_group_base, 0, 255),
+                                       ("FILES.journal_compact", self.journal_compact, 0, None),
+                                       ("FILES.avatar_cache_size", self.avatar_cache_size, 0, None),
+                                       ("SCHEDULER.send_queue_size", self.send_queue_size, 1, None),
+                                       ("SHARED_MEMORY.capacity", self.shared_memory_capacity, 1, None)):
+            if isinstance(value, bool) or not isinstance(value, int) or value < low or (high is not None and value > high):
+                raise ValueError(f"{name} must be an integer from {low}" + (f" to {high}" if high is not None else ""))
+
+        for name, value in (("NETWORK.discovery_timeout", self.discovery_timeout),
+                            ("FILES.journal_interval", self.journal_interval),
+                            ("FILES.reload_interval", self.reload_interval),
+                            ("SCHEDULER.frame_interval", self.frame_interval),
+                            ("SCHEDULER.keepalive_hot", self.keepalive_hot),
+                            ("SCHEDULER.keepalive_normal", self.keepalive_normal),
+                            ("SCHEDULER.keepalive_cold", self.keepalive_cold),
+                            ("SCHEDULER.coalesce_window", self.coalesce_window),
+                            ("SCHEDULER.pacing_min", self.pacing_min), ("SCHEDULER.pacing_max", self.pacing_max),
+                            ("SHARED_MEMORY.interval", self.shared_memory_interval)):
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not value >= 0:
+                raise ValueError(f"{name} must be a number, 0 or more")
+
+    def lane_count(self) -> int:
+        return 1 + len(self.lanes)
+
+    def lane(self, _k: int) -> dict:
+        """
+        get parameter names of sync lane
+        :param _k: (Int) lane number, 0 is the default lane
+        :return: (Dictionary) prmt_id, prmt_float, prmt_int, prmt_bool, prmt_light
+        """
+        if _k == 0:
+            return {
+                "prmt_id": self.prmt_id,
+                "prmt_float": self.prmt_float_out,
+                "prmt_int": self.prmt_int_out,
+                "prmt_bool": self.prmt_bool_out,
+                "prmt_light": self.prmt_out_light
+            }
+        return self.lanes[_k - 1]
+
+    def reserved_prmt(self) -> set:
+        """
+        get parameter names used by OSCPI itself (never written to sheet)
+        :return: (Set) parameter names
+        """
+        names = {v for v in self.todict()["PARAMETERS"].values() if isinstance(v, str)}
+        for k in range(1, self.lane_count()):
+            names.update(self.lane(k).values())
+        return names
+
+
+class AvatarIndex:
+    INDEX_VERSION = 1
+
+    def __init__(self, _root: str, _file: str):
+        """
+        Persistent index of VRChat OSC avatar config files. (avatar id -> config path, name, mtime)
+
+        directories are only listed again when their mtime changed,
+        so finding an avatar that is already indexed costs one dict lookup and one stat.
+        :param _root: (String) VRChat OSC directory
+        :param _file: (String) index file path (json format)
+        """
+        self.root = _root
+        self.file = _file
+        self.dirs: dict = dict()
+        self.avatars: dict = dict()
+        self.modified: bool = False
+        # lookups may come from several executor threads
+        self.lock = threading.Lock()
+
+        self.load()
+
+    def load(self) -> int:
+        """
+        load index file
+        :return: (Int) errno more information see this page https://docs.python.org/3/library/errno.html
+        """
+        try:
+            with open(self.file, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+
+                if raw['INDEX_VERSION'] != self.INDEX_VERSION or raw['ROOT'] != self.root:
+                    return 0
+
+                self.dirs = raw['DIRECTORIES']
+                self.avatars = raw['AVATARS']
+        except IOError as e:
+            return e.errno
+        except (ValueError, KeyError):
+            log.warning("avatar index is broken, it will be rebuilt")
+        return 0
+
+    def save(self) -> int:
+        """
+        save index file if it has been modified
+        :return: (Int) errno more information see this page https://docs.python.org/3/library/errno.html
+        """
+        if not self.modified:
+            return 0
+
+        result = {
+            "INDEX_VERSION": self.INDEX_VERSION,
+            "ROOT": self.root,
+            "DIRECTORIES": self.dirs,
+            "AVATARS": self.avatars
+        }
+
+        try:
+            tmp = self.file + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            os.replace(tmp, self.file)
+            self.modified = False
+        except IOError as e:
+            return e.errno
+        return 0
+
+    def refresh(self):
+        """
+        list directories that have been changed since last refresh
+        :return: NONE
+        """
+        stack = [self.root]
+
+        while stack:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                if path in self.dirs:
+                    del self.dirs[path]
+                    self.modified = True
+                continue
+
+            known = self.dirs.get(path)
+            if known is not None and known['mtime'] == mtime:
+                stack.extend(known['subdirs'])
+                continue
+
+            subdirs = list()
+            for entry in os.scandir(path):
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                    continue
+
+                avatar_id = os.path.splitext(entry.name)[0]
+                avatar = self.avatars.get(avatar_id)
+                if avatar is None or avatar['path'] != entry.path:
+                    # name is read when the avatar is looked up
+                    self.avatars[avatar_id] = {"path": entry.path, "name": None, "mtime": 0}
+
+            self.dirs[path] = {"mtime": mtime, "subdirs": subdirs}
+            self.modified = True
+            stack.extend(subdirs)
+
+    def __read(self, _avatar_id: str) -> str:
+        """
+        (PRIVATE) get name of indexed avatar, read config file again only when it has been changed
+        :param _avatar_id: (String) avatar id
+        :return: (String) avatar name, None if config file doesn't exist anymore
+        """
+        avatar = self.avatars.get(_avatar_id)
+        if avatar is None:
+            return None
+
+        try:
+            mtime = os.stat(avatar['path']).st_mtime
+            if avatar['name'] is None or avatar['mtime'] != mtime:
+                with open(avatar['path'], 'r', encoding='utf-8-sig') as f:
+                    avatar['name'] = json.load(f)['name']
+                avatar['mtime'] = mtime
+                self.modified = True
+        except (OSError, ValueError, KeyError):
+            del self.avatars[_avatar_id]
+            self.modified = True
+            return None
+
+        return avatar['name']
+
+    def get_name(self, _avatar_id: str) -> str:
+        """
+        get avatar name
+        :param _avatar_id: (String) avatar id
+        :return: (String) avatar name, None if not found
+        """
+        with self.lock:
+            name = self.__read(_avatar_id)
+            if name is None:
+                self.refresh()
+                name = self.__read(_avatar_id)
+
+            self.save()
+            return name
+
 
 class AvatarConfig:
-    def __init__(self):
-        self.avatar_id = oscq.get_current_avatar()
-        self.avatar_name = self.__get_avatar_name()
-        self.avatar_prmt = oscq.get_avatar_prmt()
+    # VRChat writes avatar configs of every client into one directory, all clients share one index
+    shared_index: 'AvatarIndex' = None
+    shared_lock = threading.Lock()
 
-    def __get_avatar_name(self) -> str:
+    def __init__(self, _client: 'VRChatClient'):
+        """
+        Current avatar of one VRChat client
+        :param _client: (VRChatClient) client to ask for avatar and parameters
+        """
+        with AvatarConfig.shared_lock:
+            if AvatarConfig.shared_index is None:
+                oscpath = os.path.expandvars(r'%localappdata%low/VRChat/VRChat/OSC/')
+                AvatarConfig.shared_index = AvatarIndex(oscpath, config.avatar_index_path)
+        self.index = AvatarConfig.shared_index
+        self.client = _client
+
+        self.avatar_id = self.client.get_current_avatar()
+        self.avatar_name = self.__get_avatar_name(self.avatar_id)
+        self.avatar_prmt = self.client.get_avatar_prmt()
+
+    def __get_avatar_name(self, _avatar_id: str) -> str:
         """
         (PRIVATE) get avatar name
+        :param _avatar_id: (String) avatar id
         :return: (String) avatar name
         """
-        oscpath = os.path.expandvars(r'%localappdata%low/VRChat/VRChat/OSC/')
+        return self.index.get_name(_avatar_id)
+
+    def fetch(self, _avatar_id: str) -> tuple:
+        """
+        get information of avatar without changing avatarConfig (blocking, run it outside of the event loop)
+        :param _avatar_id: (String) avatar id
+        :return: (Tuple) (id, name, parameters)
+        """
+        return _avatar_id, self.__get_avatar_name(_avatar_id), self.client.get_avatar_prmt()
 
-        for (path, dir, files) in os.walk(oscpath):
-            for filename in files:
-                ext = os.path.splitext(filename)
-                if ext[0] == self.avatar_id:
-                    avatar_file = os.path.join(path, filename)
-                    with open(avatar_file, 'r', encoding='utf-8-sig') as f:
-                        raw = json.load(f)
-                        avatar_name = raw['name']
-                        return avatar_name
+    def set(self, _info: tuple):
+        """
+        change avatarConfig at once
+        :param _info: (Tuple) (id, name, parameters) from fetch()
+        :return: None
+        """
+        self.avatar_id, self.avatar_name, self.avatar_prmt = _info
 
     def update(self, _avatar_id: str):
         """
@@ -301,9 +1016,7 @@ class AvatarConfig:
         :param _avatar_id: (String) changed avatar id
         :return: None
         """
-        self.avatar_id = _avatar_id
-        self.avatar_name = self.__get_avatar_name()
-        self.avatar_prmt = oscq.get_avatar_prmt()
+        self.set(self.fetch(_avatar_id))
 
     def get(self) -> tuple:
         """
@@ -316,120 +1029,622 @@ class AvatarConfig:
         return result
 
 
+class AvatarCache:
+    def __init__(self, _size: int):
+        """
+        LRU cache of recently used avatars. (avatar id -> (avatar info, loaded sheet))
+        :param _size: (Int) number of avatars to keep, 0 disables cache
+        """
+        self.size = _size
+        self.entries: OrderedDict = OrderedDict()
+
+    def get(self, _avatar_id: str) -> tuple:
+        """
+        get cached avatar and mark it as recently used
+        :param _avatar_id: (String) avatar id
+        :return: (Tuple) (avatar info, DataSheet), None if not cached
+        """
+        entry = self.entries.get(_avatar_id)
+        if entry is not None:
+            self.entries.move_to_end(_avatar_id)
+        return entry
+
+    def put(self, _info: tuple, _sheet: 'DataSheet') -> list:
+        """
+        add avatar to cache
+        :param _info: (Tuple) (id, name, parameters) from AvatarConfig.fetch()
+        :param _sheet: (DataSheet) loaded sheet of avatar
+        :return: (List) evicted sheets, their changes have to be written back
+        """
+        if self.size <= 0:
+            return list()
+
+        self.entries[_info[0]] = (_info, _sheet)
+        self.entries.move_to_end(_info[0])
+
+        evicted = list()
+        while len(self.entries) > self.size:
+            evicted.append(self.entries.popitem(last=False)[1][1])
+        return evicted
+
+
+class AvatarSwitcher:
+    def __init__(self, _client: 'VRChatClient'):
+        """
+        Switch avatar without blocking the event loop.
+
+        recently used avatars are taken from the cache without any network or disk access.
+        otherwise saving the old sheet and fetching the new avatar run in executor threads at the same time,
+        the new sheet is loaded off the loop and swapped in at once. a newer avatar change cancels the running one.
+        :param _client: (VRChatClient) client whose avatar is switched
+        """
+        self.client = _client
+        self.task: asyncio.Task = None
+        self.cache = AvatarCache(config.avatar_cache_size)
+
+    def request(self, _avatar_id: str):
+        """
+        start switching to avatar, cancel switch that is still in flight
+        :param _avatar_id: (String) changed avatar id
+        :return: NONE
+        """
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+            log.info("previous avatar change has been cancelled")
+
+        # a failed switch leaves the client on the old avatar, the next avatar change tries again
+        self.task = background(self.__switch(_avatar_id), f"avatar change to {_avatar_id}")
+
+    @staticmethod
+    def __open_sheet(_info: tuple) -> 'DataSheet':
+        """
+        (PRIVATE STATIC) load or create sheet of avatar (blocking)
+        :param _info: (Tuple) (id, name, parameters) from AvatarConfig.fetch()
+        :return: (DataSheet) loaded sheet
+        """
+        return DataSheet(_info[1], config.sheet_path, _info[2])
+
+    async def __switch(self, _avatar_id: str):
+        """
+        (PRIVATE) avatar switch pipeline
+        :param _avatar_id: (String) changed avatar id
+        :return: NONE
+        """
+        client = self.client
+        event_loop = asyncio.get_running_loop()
+
+        started = time.monotonic()
+
+        old = client.sheet
+        evicted = self.cache.put(client.avatar_config.get(), old)
+
+        cached = self.cache.get(_avatar_id)
+        if cached is not None:
+            info, new = cached
+            background(event_loop.run_in_executor(None, old.journal.write, old.journal.take(old.store)),
+                       f"journal write of {old.journal.file}")
+        else:
+            # save old sheet while fetching new avatar
+            background(event_loop.run_in_executor(None, old.journal.write, old.journal.take(old.store)),
+                       f"journal write of {old.journal.file}")
+            info = await event_loop.run_in_executor(None, client.avatar_config.fetch, _avatar_id)
+            new = await event_loop.run_in_executor(None, AvatarSwitcher.__open_sheet, info)
+            evicted += self.cache.put(info, new)
+
+        # <SWAP> nothing below awaits, handlers never see half switched state
+        client.avatar_config.set(info)
+        client.sheet = new
+        if client.table is not None:
+            client.table.publish(new.store)
+        for scheduler in client.schedulers:
+            scheduler.rebuild(new)
+        Receiver.rebuild_routes(client)
+        # </SWAP>
+
+        # changes that arrived for old avatar during the switch, and sheets that left the cache
+        for s in [old] + evicted:
+            if s is not new:
+                background(event_loop.run_in_executor(None, s.journal.write, s.journal.take(s.store)),
+                           f"journal write of {s.journal.file}")
+
+        metrics.avatar_change.observe(time.monotonic() - started)
+        metrics.parameters.set(len(new.store), (client.name,))
+        log.info("avatar changed: %s (%.3fs)", info[1], time.monotonic() - started)
+
+        store = new.store
+        for i in range(len(store)):
+            await client.sender.send_wait(store.get(i), store.names[i], PRINT_INFO=False)
+
+
+class RouteDispatcher(dispatcher.Dispatcher):
+    def __init__(self):
+        """
+        Dispatcher that finds handler with one exact-match lookup of the full address,
+        instead of pattern matching every mapped address.
+        messages that have no route are dropped.
+        """
+        super().__init__()
+        self.routes: dict = dict()
+        # encoded address -> (address, dispatcher.Handler), used by call_fast()
+        self.fast_routes: dict = dict()
+
+    def set_routes(self, _routes: dict):
+        """
+        replace routing table at once
+        :param _routes: (Dictionary) full address -> dispatcher.Handler
+        :return: NONE
+        """
+        self.fast_routes = {address.encode('utf-8'): (address, handler) for address, handler in _routes.items()}
+        self.routes = _routes
+
+    def call_fast(self, data: bytes, client_address):
+        """
+        dispatch datagram without decoding it into OscMessage
+
+        only the address is read before the route lookup, messages of other addresses are dropped right away.
+        single argument messages (i / f / T / F / s) are decoded by hand,
+        anything else (bundles, several arguments) goes through python-osc.
+        :param data: (Bytes) datagram
+        :param client_address: address of sender
+        :return: NONE
+        """
+        end = data.find(b'\x00')
+        route = self.fast_routes.get(data[:end])
+        if route is None:
+            if data.startswith(b'#bundle'):
+                self.call_handlers_for_packet(data, client_address)
+            else:
+                metrics.messages_received.inc(1, ('false',))
+            return
+
+        # type tag starts at next multiple of 4 after the null terminated address
+        tag_at = (end + 4) & ~3
+        tag = data[tag_at:tag_at + 4]
+        try:
+            if tag == b',f\x00\x00':
+                value = struct.unpack_from('>f', data, tag_at + 4)[0]
+            elif tag == b',i\x00\x00':
+                value = struct.unpack_from('>i', data, tag_at + 4)[0]
+            elif tag == b',T\x00\x00':
+                value = True
+            elif tag == b',F\x00\x00':
+                value = False
+            elif tag[:3] == b',s\x00':
+                value = data[tag_at + 4:data.index(b'\x00', tag_at + 4)].decode('utf-8')
+            else:
+                self.call_handlers_for_packet(data, client_address)
+                return
+        except (struct.error, ValueError):
+            # broken datagram
+            return
+
+        metrics.messages_received.inc(1, ('true',))
+        address, handler = route
+        handler.callback(address, value)
+
+    def handlers_for_address(self, address_pattern: str):
+        handler = self.routes.get(address_pattern)
+        if handler is not None:
+            metrics.messages_received.inc(1, ('true',))
+            yield handler
+        else:
+            metrics.messages_received.inc(1, ('false',))
+
+
+class ReceiverProtocol(asyncio.DatagramProtocol):
+    def __init__(self, _receiver: 'Receiver'):
+        """
+        Datagram protocol of Receiver, hands every datagram to RouteDispatcher.call_fast() of the client that sent it
+        :param _receiver: (Receiver)
+        """
+        self.receiver = _receiver
+        self.sources = _receiver.sources
+
+    def datagram_received(self, data: bytes, addr):
+        client = self.sources.get(addr)
+        if client is None:
+            client = self.receiver.pair(data, addr)
+            if client is None:
+                return
+        client.router.call_fast(data, addr)
+
+
 class Receiver:
+    dispatcher_class: type = RouteDispatcher
+
     @staticmethod
-    def avatar_change_handler(_addr, *_args):
+    def avatar_change_handler(_client, _addr, *_args):
         """
-        (STATIC) This works with dispatcher.
+        (STATIC) This works with dispatcher, bound to one client by build_routes()
 
         update sheet when avatar changed
+        :param _client: (VRChatClient) client that has sent the message
         :param _addr: VRC parameter address
         :param _args: VRC parameter value
         :return: NONE
         """
-        sheet.save(avatar_config.avatar_name, config.sheet_path)
-        avatar_config.update(_args[0])
-        sheet.update(avatar_config.avatar_name)
+        started = time.perf_counter()
+        _client.switcher.request(_args[0])
+        metrics.handler_time.observe(time.perf_counter() - started, ('avatar_change',))
 
-        for k, v in sheet.dic_prmt.items():
-            asyncio.gather(sender.send(v['value'], k))
-
-        print(Flag.Debug.value + "{}: {} \033".format(_addr, _args))
+        log.debug("%s: %s", _addr, _args)
 
     @staticmethod
-    def default_handler(_addr, *_args):
+    def prmt_handler(_client, _i, _addr, *_args):
         """
-        (STATIC) This works with dispatcher
+        (STATIC) This works with dispatcher, bound to one client and one sheet parameter by build_routes()
 
         update parameter that in sheet, when it's value has been changed
+        :param _client: (VRChatClient) client that has sent the message
+        :param _i: (Int) sheet parameter index
         :param _addr: VRC parameter address
         :param _args: VRC parameter value
         """
-        prmt = _addr[19:]
-        if prmt in sheet.lst_prmt:
-            sheet.dic_prmt[prmt]["value"] = _args[0]
-            print(Flag.Debug.value + "{}: {} \033".format(_addr, _args))
+        sheet = _client.sheet
+        sheet.store.set(_i, _args[0])
+        sheet.journal.record(_i)
 
-            # <SEND NORMAL MODE PARAMETERS>
-            if sheet.dic_prmt[prmt]['type'] == "Bool":
-                asyncio.gather(sender.send(_args[0], config.prmt_bool_out, PRINT_INFO=False))
-            elif sheet.dic_prmt[prmt]['type'] == "Int":
-                asyncio.gather(sender.send(_args[0], config.prmt_int_out, PRINT_INFO=False))
-            else:
-                asyncio.gather(sender.send(_args[0], config.prmt_float_out, PRINT_INFO=False))
-            # </SEND NORMAL MODE PARAMETERS>
+        # the frame is sent by loop() ahead of every keep-alive, bursts are coalesced into one frame
+        u = sheet.unit_of(_i)
+        if _client.schedulers[sheet.lane_of(u)].mark_dirty(u):
+            log.debug("%s: %s", _addr, _args)
 
-            # SEND LIGHT MODE PARAMETER
-            if sheet.dic_prmt[prmt]['type'] == "Int":
-                asyncio.gather(sender.send(float(_args[0]/255), config.prmt_out_light, PRINT_INFO=False))
-            else:
-                asyncio.gather(sender.send(float(_args[0]), config.prmt_out_light, PRINT_INFO=False))
-            # SEND ID
-            asyncio.gather(sender.send(sheet.dic_prmt[prmt]['id'], config.prmt_id, PRINT_INFO=False))
+    @staticmethod
+    def echo_handler(_client, _k, _addr, *_args):
+        """
+        (STATIC) This works with dispatcher, bound to id parameter of one sync lane by build_routes()
+
+        VRChat reports the id back once it has been applied to the avatar, the pacer of the lane measures it
+        :param _client: (VRChatClient) client that has sent the message
+        :param _k: (Int) lane number
+        :param _addr: VRC parameter address
+        :param _args: VRC parameter value
+        """
+        _client.pacers[_k].echo(_args[0])
+
+    @staticmethod
+    async def reset(_sender: 'Sender', _store: 'PrmtStore'):
+        """
+        (STATIC) send default value of every parameter through the send queue
+        :param _sender: (Sender) sender of the client
+        :param _store: (PrmtStore) parameters of sheet
+        :return: NONE
+        """
+        for i in range(len(_store)):
+            await _sender.send_wait(_store.get_default(i), _store.names[i], PRINT_INFO=False)
 
     @staticmethod
-    def reset_handler(_addr, *_args):
+    def reset_handler(_client, _addr, *_args):
         """
-        (STATIC) This works with dispatcher
+        (STATIC) This works with dispatcher, bound to one client by build_routes()
 
         reset avatar parameter to default, when receive reset parameter value
+        :param _client: (VRChatClient) client that has sent the message
         :param _addr: VRC parameter address
         :param _args: VRC parameter value
         """
         if _args[0]:
-            print(Flag.Info.value + "RESET AVATAR")
-            for k, v in sheet.dic_prmt.items():
-                asyncio.gather(sender.send(v["default"], k, PRINT_INFO=False))
+            log.info("RESET AVATAR (%s)", _client.name)
+            background(Receiver.reset(_client.sender, _client.sheet.store), f"reset of {_client.name}")
 
     @staticmethod
-    def build_dispatcher():
+    def build_routes(_client) -> dict:
         """
-        (STATIC) build dispatcher for receiver
+        (STATIC) build routing table of current sheet of client
+        :param _client: (VRChatClient)
+        :return: (Dictionary) full address -> dispatcher.Handler
         """
-        d = dispatcher.Dispatcher()
+        routes = dict()
 
-        d.map("/avatar/change", Receiver.avatar_change_handler)
-        d.map("/avatar/parameters/" + config.prmt_reset, Receiver.reset_handler)
+        for i, prmt in enumerate(_client.sheet.store.names):
+            handler = functools.partial(Receiver.prmt_handler, _client, i)
+            routes["/avatar/parameters/" + prmt] = dispatcher.Handler(handler, [])
 
-        d.set_default_handler(Receiver.default_handler)
+        for k in range(config.lane_count()):
+            handler = functools.partial(Receiver.echo_handler, _client, k)
+            routes["/avatar/parameters/" + config.lane(k)["prmt_id"]] = dispatcher.Handler(handler, [])
 
-        return d
+        handler = functools.partial(Receiver.avatar_change_handler, _client)
+        routes["/avatar/change"] = dispatcher.Handler(handler, [])
+        handler = functools.partial(Receiver.reset_handler, _client)
+        routes["/avatar/parameters/" + config.prmt_reset] = dispatcher.Handler(handler, [])
 
-    def __init__(self, _dispatcher: dispatcher.Dispatcher, _ip: str = "127.0.0.1", _port: int = 9001):
-        self.ip = _ip
-        self.port = _port
-        self.dispatcher = _dispatcher
+        return routes
 
-        self.server = osc_server.AsyncIOOSCUDPServer(
-            (self.ip, self.port),
-            self.dispatcher,
-            asyncio.get_event_loop()
-        )
+    @staticmethod
+    def rebuild_routes(_client):
+        """
+        (STATIC) swap routing table, call this when avatar or sheet of client has been changed
+        :param _client: (VRChatClient)
+        :return: NONE
+        """
+        if _client.router is not None:
+            _client.router.set_routes(Receiver.build_routes(_client))
+
+    @staticmethod
+    def build_dispatcher(_client):
+        """
+        (STATIC) build dispatcher of client
+        :param _client: (VRChatClient)
+        """
+        d = Receiver.dispatcher_class()
+        d.set_routes(Receiver.build_routes(_client))
+
+        return d
+
+    def __init__(self, _ip: str = "127.0.0.1", _port: int = 9001):
+        """
+        One UDP endpoint for every VRChat client.
+
+        every VRChat client sends to every advertised OSCQuery service, so datagrams are told apart by source address.
+        with one client every source belongs to it. with several clients a new source is paired with the client
+        whose OSCQuery service reports the same value for the received address, until then it is dropped.
+        sources that have been assumed (only one client or only one left) are paired again when a client is added.
+        :param _ip: (String) ip address to listen
+        :param _port: (Int) port to listen
+        """
+        self.ip = _ip
+        self.port = _port
+        # source address -> VRChatClient
+        self.sources: dict = dict()
+        # source addresses that are being paired
+        self.probing: set = set()
+        # source addresses that have been paired without probe
+        self.assumed: set = set()
 
         self.transport = None
         self.protocol = None
 
-        print(Flag.Info.value + "server has been created ({}:{})".format(self.ip, self.port))
+        log.info("server has been created (%s:%s)", self.ip, self.port)
+
+    def pair(self, _data: bytes, _addr):
+        """
+        find client of a new source address
+        :param _data: (Bytes) datagram from source
+        :param _addr: source address
+        :return: (VRChatClient) client, None if it's not known yet
+        """
+        # clients that are still loading count, their sources must not be taken by others
+        if len(clients) == 1:
+            client = next(iter(clients.values()))
+            if client.router is None:
+                return None
+            self.sources[_addr] = client
+            self.assumed.add(_addr)
+            return client
+
+        paired = set(self.sources.values())
+        candidates = [c for c in clients.values() if c not in paired]
+        if len(candidates) == 1 and candidates[0].router is not None:
+            self.sources[_addr] = candidates[0]
+            self.assumed.add(_addr)
+            log.info("%s:%s has been paired with %s", *_addr[:2], candidates[0].name)
+            return candidates[0]
+
+        if candidates and _addr not in self.probing:
+            try:
+                message = osc_message.OscMessage(_data)
+            except osc_message.ParseError:
+                return None
+            if len(message.params) == 1:
+                self.probing.add(_addr)
+                asyncio.ensure_future(self.__probe(_addr, message.address, message.params[0], candidates))
+        return None
+
+    async def __probe(self, _addr, _address: str, _value, _candidates: list):
+        """
+        (PRIVATE) pair source with the only candidate that reports the same value
+        :param _addr: source address
+        :param _address: (String) OSC address received from source
+        :param _value: value received from source
+        :param _candidates: (List) clients that have no source yet, loading ones included
+        :return: NONE
+        """
+        event_loop = asyncio.get_running_loop()
+        try:
+            values = await asyncio.gather(*[event_loop.run_in_executor(None, c.get_value, _address) for c in _candidates])
+        finally:
+            self.probing.discard(_addr)
+
+        matched = [c for c, v in zip(_candidates, values) if Receiver.__same(v, _value)]
+        if len(matched) == 1 and matched[0].router is not None and _addr not in self.sources:
+            self.sources[_addr] = matched[0]
+            self.assumed.discard(_addr)
+            log.info("%s:%s has been paired with %s", *_addr[:2], matched[0].name)
+
+    @staticmethod
+    def __same(_a, _b) -> bool:
+        if isinstance(_a, (int, float)) and isinstance(_b, (int, float)):
+            # OSC sends float32
+            return abs(_a - _b) < 1e-4
+        return _a == _b
+
+    def forget(self, _client):
+        """
+        drop source addresses of client that has gone
+        :param _client: (VRChatClient)
+        :return: NONE
+        """
+        for addr in [a for a, c in self.sources.items() if c is _client]:
+            del self.sources[addr]
+            self.assumed.discard(addr)
+
+    def unpair_assumed(self):
+        """
+        drop source addresses that have been paired without probe, they may belong to a client that has been added
+        :return: NONE
+        """
+        for addr in self.assumed:
+            self.sources.pop(addr, None)
+        self.assumed.clear()
 
     async def start(self):
         """
         run receiver
         :return: transport
         """
-        self.transport, self.protocol = await self.server.create_serve_endpoint()
+        self.transport, self.protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: ReceiverProtocol(self),
+            local_addr=(self.ip, self.port)
+        )
 
         return self.transport
 
 
+class SendPlan:
+    __slots__ = ('type', 'buffer', 'bundle', 'messages', 'value_offset', 'light_offset')
+
+    @staticmethod
+    def osc_string(_s: str) -> bytes:
+        """
+        (STATIC) encode OSC string (null terminated, padded to 4 bytes)
+        :param _s: (String)
+        :return: (Bytes) encoded string
+        """
+        b = _s.encode('utf-8')
+        return b + b'\x00' * (4 - len(b) % 4)
+
+    def __init__(self, _id: int, _type: str, _path: str = "/avatar/parameters/", _lane: int = 0):
+        """
+        Pre-encoded datagrams of one sync frame (typed out value, light value, id).
+
+        every message lives in one bundle buffer, at send time only the value bytes are patched.
+        :param _id: (Int) parameter id
+        :param _type: (String) parameter type (Int / Float / Bool)
+        :param _path: (Optional) parameter path
+        :param _lane: (Optional) sync lane that carries the frame
+        """
+        self.type = _type
+        lane = config.lane(_lane)
+
+        # <NORMAL MODE PARAMETERS>
+        if _type == 'Bool':
+            out = SendPlan.osc_string(_path + lane["prmt_bool"]) + b',F\x00\x00'
+        elif _type == 'Int':
+            out = SendPlan.osc_string(_path + lane["prmt_int"]) + b',i\x00\x00' + bytes(4)
+        else:
+            # default (float)
+            out = SendPlan.osc_string(_path + lane["prmt_float"]) + b',f\x00\x00' + bytes(4)
+        # </NORMAL MODE PARAMETERS>
+
+        light = SendPlan.osc_string(_path + lane["prmt_light"]) + b',f\x00\x00' + bytes(4)
+        id_ = SendPlan.osc_string(_path + lane["prmt_id"]) + b',i\x00\x00' + struct.pack('>i', _id)
+
+        buffer = bytearray(b'#bundle\x00' + struct.pack('>Q', 1))
+        spans = list()
+        for msg in (out, light, id_):
+            buffer += struct.pack('>i', len(msg))
+            spans.append((len(buffer), len(buffer) + len(msg)))
+            buffer += msg
+
+        self.buffer = buffer
+        self.bundle = memoryview(buffer)
+        self.messages = tuple(self.bundle[start:end] for start, end in spans)
+
+        if _type == 'Bool':
+            # bool has no argument, the type tag itself ('T' / 'F') is the value
+            self.value_offset = spans[0][1] - 3
+        else:
+            self.value_offset = spans[0][1] - 4
+        self.light_offset = spans[1][1] - 4
+
+    def patch(self, _value):
+        """
+        write value into the pre-encoded datagrams
+        :param _value: value to send
+        :return: NONE
+        """
+        if self.type == 'Bool':
+            self.buffer[self.value_offset] = 84 if _value else 70
+            struct.pack_into('>f', self.buffer, self.light_offset, 1.0 if _value else 0.0)
+        elif self.type == 'Int':
+            struct.pack_into('>i', self.buffer, self.value_offset, _value)
+            struct.pack_into('>f', self.buffer, self.light_offset, _value / 255)
+        else:
+            struct.pack_into('>f', self.buffer, self.value_offset, _value)
+            struct.pack_into('>f', self.buffer, self.light_offset, _value)
+
+
+class BoolCodec:
+    def __init__(self, _store, _base: int = 224):
+        """
+        Pack Bool parameters into Int frames, 8 bools per frame.
+
+        Bool with id N is bit (N % 8) of group (N // 8), the group is sent as Int frame with id (_base + N // 8).
+        groups whose id would not fit in the id range are left unpacked, so are groups whose id is used by
+        a parameter that is sent on its own (the receiver could not tell the two frames apart).
+        :param _store: (PrmtStore) parameters of sheet
+        :param _base: (Int) id of group 0
+        """
+        self.base = _base
+        # group id -> list of (bit mask, parameter index)
+        self.groups: dict = dict()
+        self.unpacked: list = list()
+        # group id -> parameter index that uses the id, the group is left unpacked
+        self.collisions: dict = dict()
+
+        for i in range(len(_store)):
+            if _store.types[i] != 2 or _store.ids[i] not in range(0, 256):
+                continue
+            group = _base + _store.ids[i] // 8
+            if group > 255:
+                self.unpacked.append(i)
+                continue
+            self.groups.setdefault(group, list()).append((1 << _store.ids[i] % 8, i))
+
+        # id -> parameter index of frames that are sent on their own
+        single = {_store.ids[i]: i for i in range(len(_store))
+                  if _store.ids[i] in range(0, 256) and (_store.types[i] != 2 or i in self.unpacked)}
+        clashes = [g for g in self.groups if g in single]
+        while clashes:
+            # bools of an unpacked group are sent on their own, their ids may clash with other groups
+            for group in clashes:
+                self.collisions[group] = single[group]
+                for _, i in self.groups.pop(group):
+                    self.unpacked.append(i)
+                    single[_store.ids[i]] = i
+            clashes = [g for g in self.groups if g in single]
+
+    @staticmethod
+    def encode(_store, _members: list) -> int:
+        """
+        (STATIC) build bit mask of group
+        :param _store: (PrmtStore) parameters of sheet
+        :param _members: (List) (bit mask, parameter index) of group
+        :return: (Int) bit mask (0 ~ 255)
+        """
+        mask = 0
+        for bit, i in _members:
+            if _store.values[i] != 0.0:
+                mask |= bit
+        return mask
+
+
 class Sender:
-    def __init__(self, _ip: str = "127.0.0.1", _port: int = 9000):
+    def __init__(self, _ip: str = "127.0.0.1", _port: int = 9000, _bundle: bool = False, _queue_size: int = 1024):
         """
         Create instance that Send OSC packet to server.
+
+        every datagram goes through one bounded queue drained by run(), the single writer.
+        a sync frame is one queue item and is written at once, frames never interleave.
         :param _ip: (String) server ip address that send OSC packet
         :param _port: (Int) server ip port that send OSC packet
+        :param _bundle: (Bool) send each sync frame as one OSC bundle datagram
+        :param _queue_size: (Int) max number of queued frames / messages
         """
         self.client = udp_client.SimpleUDPClient(_ip, _port)
-        print(Flag.Info.value + f"Client has been created ({_ip}:{_port})")
+        self.address = (_ip, _port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.bundle = _bundle
+
+        # key (SendPlan or address) -> (item, keep-alive)
+        self.queue: OrderedDict = OrderedDict()
+        self.queue_size = _queue_size
+        self.ready = asyncio.Event()
+        self.space = asyncio.Event()
+        self.task: asyncio.Task = None
+        log.info("Client has been created (%s:%s)", _ip, _port)
 
     def update(self, _ip: str, _port: int):
         """
@@ -439,26 +1654,734 @@ class Sender:
         :return:
         """
         self.client = udp_client.SimpleUDPClient(_ip, _port)
-        print(Flag.Info.value + f"Client has been updated ({_ip}:{_port})")
+        self.address = (_ip, _port)
+        log.info("Client has been updated (%s:%s)", _ip, _port)
+
+    def put(self, _key, _item: tuple, _keepalive: bool = False):
+        """
+        queue frame or message, never blocks
+
+        overflow policy: item with the same key is replaced in place (last value wins),
+        when queue is full the oldest keep-alive frame is dropped, if there's none the oldest item.
+        :param _key: key of item, SendPlan for frames, address for messages
+        :param _item: (Tuple) (SendPlan, value, PRINT_INFO) or (address, value, PRINT_INFO)
+        :param _keepalive: (Bool) item only repeats a value that has been sent already
+        :return: NONE
+        """
+        queued = self.queue.get(_key)
+        if queued is not None:
+            self.queue[_key] = (_item, _keepalive and queued[1])
+            metrics.send_queue_dropped.inc(1, ('collapsed',))
+        else:
+            if len(self.queue) >= self.queue_size:
+                self.__drop()
+            self.queue[_key] = (_item, _keepalive)
+
+        metrics.send_queue_depth.set(len(self.queue))
+        self.ready.set()
+
+    def __drop(self):
+        """
+        (PRIVATE) make room for one item
+        :return: NONE
+        """
+        for key, (_, keepalive) in self.queue.items():
+            if keepalive:
+                del self.queue[key]
+                metrics.send_queue_dropped.inc(1, ('keepalive',))
+                return
+
+        self.queue.popitem(last=False)
+        metrics.send_queue_dropped.inc(1, ('oldest',))
+
+    def send_frame(self, _plan: SendPlan, _value, _keepalive: bool = False, PRINT_INFO: bool = True):
+        """
+        queue one sync frame
+        :param _plan: (SendPlan) plan of the frame unit
+        :param _value: value to send
+        :param _keepalive: (Bool) frame only repeats the last sent value
+        :param PRINT_INFO: (Optional) print send result
+        """
+        self.put(_plan, (_plan, _value, PRINT_INFO), _keepalive)
 
-    async def send(self, ctx, prmt: str, path: str = "/avatar/parameters/", PRINT_INFO: bool = True):
+    def send(self, ctx, prmt: str, path: str = "/avatar/parameters/", PRINT_INFO: bool = True):
         """
-        send osc packet
+        queue osc packet
         :param ctx: context to send
         :param prmt: VRC parameter name
         :param path: (Optional) parameter path
         """
         full_path = path + prmt
-        self.client.send_message(full_path, ctx)
+        self.put(full_path, (full_path, ctx, PRINT_INFO))
+
+    async def send_wait(self, ctx, prmt: str, path: str = "/avatar/parameters/", PRINT_INFO: bool = True):
+        """
+        queue osc packet, wait while queue is full instead of dropping (for bulk sends)
+        :param ctx: context to send
+        :param prmt: VRC parameter name
+        :param path: (Optional) parameter path
+        """
+        while len(self.queue) >= self.queue_size:
+            self.space.clear()
+            await self.space.wait()
+        self.send(ctx, prmt, path, PRINT_INFO)
+
+    def start(self) -> asyncio.Task:
+        """
+        start the writer task (on the event loop), it's started again if it fails
+        :return: (Task) writer task
+        """
+        self.task = asyncio.ensure_future(self.run())
+        self.task.add_done_callback(self.__restart)
+        return self.task
+
+    def __restart(self, _task: asyncio.Task):
+        """
+        (PRIVATE) done callback of writer task
+        :param _task: (Task) writer task that has ended
+        :return: NONE
+        """
+        if _task.cancelled() or _task is not self.task:
+            return
+        log.error("writer to %s:%s has failed, restarting: %r", *self.address, _task.exception())
+        self.start()
+        if self.queue:
+            self.ready.set()
+
+    async def run(self):
+        """
+        single writer, drain queue in order
+        :return: NONE
+        """
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+
+            written = 0
+            while self.queue:
+                _, (item, _) = self.queue.popitem(last=False)
+                try:
+                    if isinstance(item[0], SendPlan):
+                        self.send_plan(*item)
+                    else:
+                        self.client.send_message(item[0], item[1])
+                        if item[2]:
+                            log.debug("SEND COMPLETE prm: %s - ctx: (%s) %s", item[0], type(item[1]), item[1])
+                except OSError as e:
+                    log.warning("datagram to %s:%s has been dropped: %s", *self.address, e)
+                    metrics.send_queue_dropped.inc(1, ('error',))
+                except (struct.error, OverflowError, ValueError, TypeError, osc_message_builder.BuildError) as e:
+                    # value does not fit the parameter type (Int out of int32, float out of float32, ...)
+                    log.error("value %r could not be encoded: %s", item[1], e)
+                    metrics.send_queue_dropped.inc(1, ('encode',))
+
+                written += 1
+                if written % 64 == 0:
+                    # let bulk senders refill and other tasks run
+                    self.space.set()
+                    await asyncio.sleep(0)
+
+            self.space.set()
+            metrics.send_queue_depth.set(0)
+
+    def send_plan(self, _plan: SendPlan, _value, PRINT_INFO: bool = True):
+        """
+        write one sync frame from pre-encoded send plan (called by the writer only)
+
+        without bundle the frame is sent message by message (value, light, id), it stops at the first
+        datagram the socket refuses, so an id never goes out without its value.
+        :param _plan: (SendPlan) plan of the parameter
+        :param _value: value to send
+        :param PRINT_INFO: (Optional) print send result
+        :return: (Bool) False if the frame has been dropped
+        """
+        _plan.patch(_value)
+
+        if self.bundle:
+            if not self.__write(_plan.bundle):
+                return False
+        else:
+            for msg in _plan.messages:
+                if not self.__write(msg):
+                    return False
 
         if PRINT_INFO:
-            print(Flag.Info.value + f"SEND COMPLETE prm: {prmt} - ctx: ({type(ctx)}) {ctx}")
+            log.debug("SEND COMPLETE frame: (%s) %s", _plan.type, _value)
+        return True
+
+    def __write(self, _datagram) -> bool:
+        """
+        (PRIVATE) write one datagram, it's dropped if the socket refuses it (full buffer, unreachable, ...)
+        :param _datagram: (Bytes) datagram
+        :return: (Bool) False if it has been dropped
+        """
+        try:
+            self.socket.sendto(_datagram, self.address)
+        except OSError as e:
+            log.warning("datagram to %s:%s has been dropped: %s", *self.address, e)
+            metrics.send_queue_dropped.inc(1, ('error',))
+            return False
+        return True
+
+
+class PrmtStore:
+    TYPES = ('Int', 'Float', 'Bool', 'UNKNOWN')
+    CLASSES = tuple(RefreshClass)
+
+    def __init__(self):
+        """
+        Compact struct-of-arrays storage of sheet parameters.
+
+        every column is a typed array, parameter is identified by its index.
+        values are stored as double and converted back to the parameter type when read.
+        types OSCPI doesn't know are stored as UNKNOWN, their type text is kept as it is.
+        """
+        self.names: list = list()
+        self.index: dict = dict()
+        self.ids = array('i')
+        self.types = array('B')
+        # parameter index -> type text of UNKNOWN type
+        self.raw_types: dict = dict()
+        self.values = array('d')
+        self.defaults = array('d')
+        self.classes = array('B')
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append(self, _name: str, _id: int, _type: str, _value=0, _default=0, _class: RefreshClass = RefreshClass.Normal) -> int:
+        """
+        add parameter
+        :param _name: (String) parameter name
+        :param _id: (Int) parameter id
+        :param _type: (String) parameter type (Int / Float / Bool), other type text is kept as UNKNOWN
+        :param _value: saved value
+        :param _default: default value
+        :param _class: (RefreshClass) refresh class
+        :return: (Int) index of parameter
+        """
+        i = len(self.names)
+
+        self.names.append(_name)
+        self.index[_name] = i
+        self.ids.append(_id)
+        if _type in PrmtStore.TYPES[:3]:
+            self.types.append(PrmtStore.TYPES.index(_type))
+        else:
+            self.types.append(3)
+            self.raw_types[i] = _type
+        self.values.append(_value)
+        self.defaults.append(_default)
+        self.classes.append(PrmtStore.CLASSES.index(_class))
+
+        return i
+
+    def __convert(self, _i: int, _value: float):
+        """
+        (PRIVATE) convert stored double to parameter type
+        :param _i: (Int) parameter index
+        :param _value: (Float) stored value
+        :return: typed value
+        """
+        t = self.types[_i]
+        if t == 0:
+            return int(_value)
+        elif t == 2:
+            return _value != 0.0
+        return _value
+
+    def type(self, _i: int) -> str:
+        if self.types[_i] == 3:
+            return self.raw_types.get(_i, 'UNKNOWN')
+        return PrmtStore.TYPES[self.types[_i]]
+
+    def refresh_class(self, _i: int) -> RefreshClass:
+        return PrmtStore.CLASSES[self.classes[_i]]
+
+    def get(self, _i: int):
+        return self.__convert(_i, self.values[_i])
+
+    def get_default(self, _i: int):
+        return self.__convert(_i, self.defaults[_i])
+
+    def set(self, _i: int, _value):
+        self.values[_i] = _value
+
+    # <BINARY SHEET>
+    # header | names ('\0' separated utf-8) | ids (int32) | types (uint8) | classes (uint8) | values (double) | defaults (double)
+    # | (flag RAW_TYPES) size (uint32) + type text of UNKNOWN types ('\0' separated "index:text" utf-8)
+    # little endian, columns start at 8 byte aligned offsets
+    MAGIC = b'OSCPISHT'
+    FORMAT_VERSION = 1
+    HEADER = struct.Struct('<8sHHIII8x')
+    # header flags
+    RAW_TYPES = 1
+
+    @staticmethod
+    def __align(_n: int) -> int:
+        return (_n + 7) & ~7
+
+    def pack(self) -> bytes:
+        """
+        encode store as binary sheet
+        :return: (Bytes) binary sheet
+        """
+        names = '\x00'.join(self.names).encode('utf-8')
+        offset = PrmtStore.__align(PrmtStore.HEADER.size + len(names))
+
+        columns = [self.ids, self.types, self.classes]
+        if sys.byteorder != 'little':
+            columns = [array(c.typecode, c) for c in columns]
+            for c in columns:
+                c.byteswap()
+
+        flags = PrmtStore.RAW_TYPES if self.raw_types else 0
+        body = bytearray(PrmtStore.HEADER.pack(PrmtStore.MAGIC, PrmtStore.FORMAT_VERSION, flags, len(self), len(names), offset))
+        body += names
+        body += bytes(offset - len(body))
+        for c in columns:
+            body += c.tobytes()
+        body += bytes(PrmtStore.__align(len(body)) - len(body))
+
+        for c in (self.values, self.defaults):
+            if sys.byteorder != 'little':
+                # values may be a view of shared memory table
+                c = array('d', c)
+                c.byteswap()
+            body += c.tobytes()
+
+        if self.raw_types:
+            raw = '\x00'.join(f"{i}:{t}" for i, t in sorted(self.raw_types.items())).encode('utf-8')
+            body += struct.pack('<I', len(raw)) + raw
+
+        return bytes(body)
+
+    @staticmethod
+    def unpack(_buffer) -> 'PrmtStore':
+        """
+        (STATIC) decode binary sheet, columns are copied at once without parsing rows
+        :param _buffer: (Bytes / mmap) binary sheet
+        :raise ValueError: not a binary sheet, or it's truncated / corrupt
+        :return: (PrmtStore) decoded store
+        """
+        if len(_buffer) < PrmtStore.HEADER.size:
+            raise ValueError("not a binary sheet, file is too short")
+        magic, version, flags, count, names_size, offset = PrmtStore.HEADER.unpack_from(_buffer, 0)
+        if magic != PrmtStore.MAGIC or version != PrmtStore.FORMAT_VERSION:
+            raise ValueError("not a binary sheet or unsupported version")
+
+        store = PrmtStore()
+
+        start = PrmtStore.HEADER.size
+        if start + names_size > offset:
+            raise ValueError(f"names ({names_size} bytes) overlap the columns")
+        if count > 0:
+            store.names = bytes(_buffer[start:start + names_size]).decode('utf-8').split('\x00')
+        if len(store.names) != count:
+            raise ValueError(f"{len(store.names)} names for {count} parameters")
+        store.index = {name: i for i, name in enumerate(store.names)}
+
+        for name, typecode in (('ids', 'i'), ('types', 'B'), ('classes', 'B'), ('values', 'd'), ('defaults', 'd')):
+            if typecode == 'd':
+                offset = PrmtStore.__align(offset)
+            column = array(typecode)
+            column.frombytes(_buffer[offset:offset + column.itemsize * count])
+            if len(column) != count:
+                raise ValueError(f"{name} column is truncated ({len(column)} of {count})")
+            if sys.byteorder != 'little':
+                column.byteswap()
+            setattr(store, name, column)
+            offset += column.itemsize * count
+
+        if any(t >= len(PrmtStore.TYPES) for t in store.types) or any(c >= len(PrmtStore.CLASSES) for c in store.classes):
+            raise ValueError("unknown type or refresh class code")
+
+        if flags & PrmtStore.RAW_TYPES:
+            if offset + 4 > len(_buffer):
+                raise ValueError("type text is truncated")
+            size = struct.unpack_from('<I', _buffer, offset)[0]
+            raw = bytes(_buffer[offset + 4:offset + 4 + size])
+            if len(raw) != size:
+                raise ValueError("type text is truncated")
+            for entry in raw.decode('utf-8').split('\x00'):
+                i, _, text = entry.partition(':')
+                if not i.isdigit() or int(i) >= count or store.types[int(i)] != 3:
+                    raise ValueError(f"type text of unknown parameter {entry!r}")
+                store.raw_types[int(i)] = text
+
+        return store
+    # </BINARY SHEET>
+
+
+class PrmtView:
+    __slots__ = ('store', 'i')
+
+    def __init__(self, _store: PrmtStore, _i: int):
+        """
+        Dictionary like view of one parameter of PrmtStore. keys: id, type, value, default, class
+        :param _store: (PrmtStore)
+        :param _i: (Int) parameter index
+        """
+        self.store = _store
+        self.i = _i
+
+    def __getitem__(self, _key: str):
+        if _key == 'value':
+            return self.store.get(self.i)
+        elif _key == 'id':
+            return self.store.ids[self.i]
+        elif _key == 'type':
+            return self.store.type(self.i)
+        elif _key == 'default':
+            return self.store.get_default(self.i)
+        elif _key == 'class':
+            return self.store.refresh_class(self.i)
+        raise KeyError(_key)
+
+    def __setitem__(self, _key: str, _value):
+        if _key == 'value':
+            self.store.set(self.i, _value)
+        elif _key == 'id':
+            self.store.ids[self.i] = _value
+        elif _key == 'default':
+            self.store.defaults[self.i] = _value
+        elif _key == 'class':
+            self.store.classes[self.i] = PrmtStore.CLASSES.index(_value)
+        else:
+            raise KeyError(_key)
+
+    def __repr__(self) -> str:
+        return repr({k: self[k] for k in ('id', 'type', 'value', 'default', 'class')})
+
+
+class PrmtDictView(Mapping):
+    def __init__(self, _store: PrmtStore):
+        """
+        (compatibility) read only mapping of parameter name -> PrmtView, what dic_prmt used to be
+        :param _store: (PrmtStore)
+        """
+        self.store = _store
+
+    def __getitem__(self, _key: str) -> PrmtView:
+        return PrmtView(self.store, self.store.index[_key])
+
+    def __iter__(self):
+        return iter(self.store.names)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __contains__(self, _key) -> bool:
+        return _key in self.store.index
+
+
+class FileWatcher:
+    def __init__(self):
+        """
+        Detect edited files by polling os.stat (mtime, size), works on every platform without OS notification.
+        """
+        self.signatures: dict = dict()
+
+    @staticmethod
+    def signature(_file: str) -> tuple:
+        """
+        (STATIC) get stat signature of file
+        :param _file: (String) file path
+        :return: (Tuple) (mtime ns, size), None if file doesn't exist
+        """
+        try:
+            st = os.stat(_file)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def changed(self, _file: str) -> bool:
+        """
+        check file, first check of a file only remembers it
+        :param _file: (String) file path
+        :return: (Bool) True if file has been written since last check
+        """
+        signature = FileWatcher.signature(_file)
+        previous = self.signatures.get(_file, signature)
+        self.signatures[_file] = signature
+        return signature is not None and signature != previous
+
+
+class JournalFile:
+    # sheet file path -> JournalFile, clients on the same avatar write the same files
+    opened: dict = dict()
+    opened_lock = threading.Lock()
+
+    def __init__(self):
+        """
+        State of one journal file that every Journal of the same sheet file shares
+        """
+        self.entries: int = 0
+        # sequence number of the last take(), every row carries the one it was taken with
+        self.taken: int = 0
+        # rows up to this sequence number are in the sheet file
+        self.compacted: int = 0
+        # FileWatcher signature of the last sheet file OSCPI has written itself, reload skips it
+        self.written: tuple = None
+        # writes may come from several executor threads and clients
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def open(_sheet_file: str) -> 'JournalFile':
+        """
+        (STATIC) state of journal of sheet file, created at first use
+        :param _sheet_file: (String) sheet file path
+        :return: (JournalFile)
+        """
+        key = os.path.abspath(_sheet_file)
+        with JournalFile.opened_lock:
+            if key not in JournalFile.opened:
+                JournalFile.opened[key] = JournalFile()
+            return JournalFile.opened[key]
+
+
+class Journal:
+    def __init__(self, _file: str, _path: str):
+        """
+        Append-only change journal of a sheet. (parameter name, value) rows are written next to the sheet csv,
+        so saving costs as much as the number of changes, not the sheet size.
+
+        sheets of the same avatar in several clients keep their own pending changes,
+        but share lock and sequence numbers of the files (JournalFile).
+        :param _file: (String) sheet file name (without extension)
+        :param _path: (String) sheet directory path
+        """
+        self.sheet_file = os.path.join(_path, _file + DataSheet.extension())
+        self.file = os.path.join(_path, _file + '.journal')
+        # compact() moves the journal aside and writes the next sheet file here until both are done
+        self.aside = self.file + '.old'
+        self.next_sheet = self.sheet_file + '.compact'
+        self.pending: dict = dict()
+        self.shared = JournalFile.open(self.sheet_file)
+        self.lock = self.shared.lock
+
+    @property
+    def entries(self) -> int:
+        return self.shared.entries
+
+    @entries.setter
+    def entries(self, _entries: int):
+        self.shared.entries = _entries
+
+    @property
+    def taken(self) -> int:
+        return self.shared.taken
+
+    @taken.setter
+    def taken(self, _taken: int):
+        self.shared.taken = _taken
+
+    @property
+    def compacted(self) -> int:
+        return self.shared.compacted
+
+    @compacted.setter
+    def compacted(self, _compacted: int):
+        self.shared.compacted = _compacted
+
+    @property
+    def written(self) -> tuple:
+        return self.shared.written
+
+    @written.setter
+    def written(self, _written: tuple):
+        self.shared.written = _written
+
+    def record(self, _i: int):
+        """
+        remember changed parameter, value is read when written
+        :param _i: (Int) parameter index
+        :return: NONE
+        """
+        self.pending[_i] = None
+
+    def take(self, _store: PrmtStore) -> list:
+        """
+        take pending changes as journal rows
+        :param _store: (PrmtStore) store of the sheet
+        :return: (List) [name, value, sequence number] rows
+        """
+        self.taken += 1
+        rows = [[_store.names[i], _store.get(i), self.taken] for i in self.pending]
+        self.pending = dict()
+        self.entries += len(rows)
+        return rows
+
+    def write(self, _rows: list):
+        """
+        append rows to journal file, safe to call outside of the event loop
+        :param _rows: (List) rows from take()
+        :return: NONE
+        """
+        if not _rows:
+            return
+
+        with self.lock:
+            # rows taken before a snapshot that is in the sheet file already are older than the sheet
+            rows = [r for r in _rows if r[2] > self.compacted]
+            if not rows:
+                return
+            with open(self.file, 'a', newline='') as f:
+                csv.writer(f).writerows(rows)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def flush(self, _store: PrmtStore):
+        """
+        write pending changes right now
+        :param _store: (PrmtStore) store of the sheet
+        :return: NONE
+        """
+        rows = self.take(_store)
+        if rows:
+            self.write(rows)
+
+    def compact(self, _snapshot, _seq: int):
+        """
+        write full sheet into sheet file and drop the journal rows it holds, safe to call outside of the event loop
+
+        rows taken after the snapshot stay in the journal, a snapshot older than the sheet file is skipped.
+        the journal is moved aside until the new sheet file is in place, replay() finishes a compaction cut by a crash.
+        :param _snapshot: (List / Bytes) from DataSheet.snapshot()
+        :param _seq: (Int) Journal.taken when the snapshot was taken (on the event loop)
+        :return: NONE
+        """
+        with self.lock:
+            if _seq < self.compacted:
+                return
+
+            DataSheet.write_snapshot(_snapshot, self.next_sheet)
+
+            kept = list()
+            if os.path.exists(self.file):
+                with open(self.file, 'r', newline='') as f:
+                    kept = [line for line in csv.reader(f) if Journal.__seq(line) > _seq]
+                os.replace(self.file, self.aside)
+            if kept:
+                with open(self.file, 'w', newline='') as f:
+                    csv.writer(f).writerows(kept)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            os.replace(self.next_sheet, self.sheet_file)
+            self.written = FileWatcher.signature(self.sheet_file)
+            if os.path.exists(self.aside):
+                os.remove(self.aside)
+
+            self.compacted = _seq
+            self.entries = len(kept)
+
+    def clear(self):
+        """
+        drop all journal rows, sheet file has been replaced by hand
+        :return: NONE
+        """
+        with self.lock:
+            for file in (self.file, self.aside, self.next_sheet):
+                if os.path.exists(file):
+                    os.remove(file)
+            self.compacted = self.taken
+            self.entries = 0
+
+    @staticmethod
+    def __seq(_line: list) -> int:
+        """
+        (PRIVATE STATIC) sequence number of journal row
+        :param _line: (List) csv row
+        :return: (Int) sequence number, 0 for rows without one or cut by a crash
+        """
+        try:
+            return int(_line[2])
+        except (IndexError, ValueError):
+            return 0
+
+    def recover(self):
+        """
+        finish compaction that has been cut by a crash, before the journal is replayed
+
+        if the next sheet file is still there the old sheet file is current, rows moved aside are put back.
+        otherwise the new sheet file is in place and rows moved aside are in it.
+        :return: NONE
+        """
+        if not os.path.exists(self.next_sheet):
+            if os.path.exists(self.aside):
+                os.remove(self.aside)
+            return
+
+        if os.path.exists(self.aside):
+            rows = list()
+            for file in (self.aside, self.file):
+                if os.path.exists(file):
+                    with open(file, 'r', newline='') as f:
+                        rows += list(csv.reader(f))
+            tmp = self.file + '.tmp'
+            with open(tmp, 'w', newline='') as f:
+                csv.writer(f).writerows(rows)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.file)
+            os.remove(self.aside)
+        os.remove(self.next_sheet)
+        log.warning("compaction of %s has been cut, journal is replayed on the previous sheet", self.sheet_file)
+
+    def replay(self, _store: PrmtStore) -> int:
+        """
+        apply journal rows to store
+        :param _store: (PrmtStore) store of the sheet
+        :return: (Int) number of replayed rows
+        """
+        with self.lock:
+            return self.__replay(_store)
+
+    def __replay(self, _store: PrmtStore) -> int:
+        """
+        (PRIVATE) replay(), lock is held
+        :param _store: (PrmtStore) store of the sheet
+        :return: (Int) number of replayed rows
+        """
+        self.recover()
+        if not os.path.exists(self.file):
+            return 0
+
+        count = 0
+        with open(self.file, 'r') as f:
+            for line in csv.reader(f):
+                # the last row may be cut by a crash
+                if len(line) < 2 or line[0] not in _store.index:
+                    continue
+                i = _store.index[line[0]]
+                # rows of this process are numbered after the replayed ones
+                self.taken = max(self.taken, Journal.__seq(line))
+
+                try:
+                    if _store.type(i) == 'Bool':
+                        _store.set(i, line[1] == 'True')
+                    elif _store.type(i) == 'Int':
+                        _store.set(i, int(line[1]))
+                    else:
+                        _store.set(i, float(line[1]))
+                except ValueError:
+                    continue
+                count += 1
+
+        self.entries = count
+        return count
 
 
 class DataSheet:
-    def __init__(self, _file: str, _path: str = None):
-        self.lst_prmt: list = list()
-        self.dic_prmt: dict = dict()
+    def __init__(self, _file: str, _path: str = None, _prmt: dict = None):
+        self.store: PrmtStore = PrmtStore()
+        self.journal: Journal = None
+        self.plans: list = list()
+        self.units: list = list()
+        self.groups: list = list()
+        self.lanes: list = list()
+        self.plan_revision: int = -1
         self.lst_blacklist: list = [
             "GestureRight",
             "GestureLeft",
@@ -492,17 +2415,17 @@ class DataSheet:
         ]
 
         if self.__load_blacklist() == errno.ENOENT:
-            print(Flag.Info.value + "there's no blacklist file. now create new one.")
+            log.info("there's no blacklist file. now create new one.")
             self.__create_blacklist()
             self.__load_blacklist()
 
-        self.update(_file, _path)
+        self.update(_file, _path, _prmt)
 
     def __type_enum(self, _t) -> str:
         """
         convert type character to type name
         :param _t: (String) type character from VRC
-        :return: (String) type name
+        :return: (String) type name, other type characters are kept as they are
         """
         if _t == 'i':
             return 'Int'
@@ -511,7 +2434,7 @@ class DataSheet:
         elif _t == 'T':
             return 'Bool'
         else:
-            return 'UNKNOWN'
+            return _t
 
     def __recursive_DFS(self, prmt: dict, writer: csv.writer, _i: int) -> int:
         """
@@ -523,21 +2446,94 @@ class DataSheet:
         """
         i = _i
 
+        for name, t in self.__walk(prmt):
+            writer.writerow([i, name, t, 0, 0, RefreshClass.Normal.value])
+            i = i + 1
+
+        return i
+
+    def __walk(self, prmt: dict):
+        """
+        (PRIVATE) parameters of avatar parameter tree that belong in sheet (not ignored, blacklisted or reserved)
+        :param prmt: (Dictionary) data dict for searching
+        :return: (Generator) (parameter name, type name)
+        """
         for k, v in prmt['CONTENTS'].items():
             if k in config.ignore_addr:
                 continue
             if v['FULL_PATH'][19:] in self.lst_blacklist:
                 continue
-            if v['FULL_PATH'][19:] in list(config.todict()["PARAMETERS"].values()):
+            if v['FULL_PATH'][19:] in config.reserved_prmt():
                 continue
 
             if 'TYPE' in v:
-                writer.writerow([i, v['FULL_PATH'][19:], self.__type_enum(v['TYPE']), 0, 0])
-                i = i + 1
+                yield v['FULL_PATH'][19:], self.__type_enum(v['TYPE'])
             else:
-                i = self.__recursive_DFS(v, writer, i)
+                yield from self.__walk(v)
 
-        return i
+    def apply_blacklist(self, _prmt: dict) -> PrmtStore:
+        """
+        read blacklist file again, blacklisted parameters are removed from sheet,
+        parameters of avatar that have been taken out of blacklist are added with new ids (blocking)
+        :param _prmt: (Dictionary) avatar parameter tree
+        :return: (PrmtStore) edited parameters, None if sheet stays the same
+        """
+        previous = set(self.lst_blacklist)
+        if self.__load_blacklist() != 0:
+            return None
+        allowed = previous.difference(self.lst_blacklist)
+
+        old = self.store
+        store = PrmtStore()
+        for i, name in enumerate(old.names):
+            if self.__filter(name):
+                store.append(name, old.ids[i], old.type(i), old.values[i], old.defaults[i], old.refresh_class(i))
+
+        next_id = max(old.ids, default=0) + 1
+        if _prmt is not None:
+            for name, t in self.__walk(_prmt):
+                if name in allowed and name not in store.index:
+                    store.append(name, next_id, t)
+                    next_id += 1
+
+        if store.names == old.names:
+            return None
+        return store
+
+    def replace(self, _store: PrmtStore):
+        """
+        swap in edited parameters, current values of parameters that are still in the sheet are kept
+        :param _store: (PrmtStore) edited parameters
+        :return: NONE
+        """
+        old = self.store
+        for i, name in enumerate(_store.names):
+            j = old.index.get(name)
+            if j is not None:
+                _store.values[i] = old.values[j]
+
+        self.store = _store
+        self.compile_plans()
+
+    def frames(self) -> list:
+        """
+        what every frame unit sends, compared before and after an edit to find the units it has changed
+        :return: (List) (unit key, frame) of every frame unit, key is parameter name or bool group id
+        """
+        if self.plan_revision != config.revision:
+            self.compile_plans()
+
+        n = len(self.store)
+        frames = list()
+        for u, plan in enumerate(self.plans):
+            key = self.unit_key(u)
+            frame = None
+            if plan is not None:
+                frame = (self.unit_id(u), plan.type, tuple(config.lane(self.lanes[u]).values()))
+                if u >= n:
+                    frame += tuple((mask, self.store.names[i]) for mask, i in self.groups[u - n])
+            frames.append((key, frame))
+        return frames
 
     def __load_blacklist(self) -> int:
         """
@@ -569,11 +2565,11 @@ class DataSheet:
                 for prmt in self.lst_blacklist:
                     writer.writerow([prmt])
 
-                print(Flag.Info.value + "Blacklist file has been created!")
+                log.info("Blacklist file has been created!")
         except IOError as e:
             return e.errno
         except Exception as e:
-            print(e)
+            log.error("%s", e)
         return 0
 
     def __filter(self, _key: str) -> bool:
@@ -594,54 +2590,12 @@ class DataSheet:
         :param _file: (String) file name that to load (svc format)
         :return: (Int) errno more information see this page https://docs.python.org/3/library/errno.html
 
-        Data sheet information: [id | parameter_name | parameter_type | saved value | default value]
+        Data sheet information: [id | parameter_name | parameter_type | saved value | default value | refresh class]
         """
 
         try:
-            file = os.path.join(_path, _file)
-            with open(file, 'r') as f:
-                reader = csv.reader(f)
-
-                lst = list()
-                dic = dict()
-                for line in reader:
-                    if line[0] == 'ID':
-                        continue
-
-                    lst.append(line[1])
-                    dic[line[1]] = {
-                        "id": int(line[0]),
-                        "type": line[2],
-                        "value": 0,
-                        "default": 0
-                    }
-
-                    # load last state
-                    if len(line) >= 4:
-                        if line[2] == "Bool":
-                            if line[3] == 'True':
-                                dic[line[1]]['value'] = True
-                            else:
-                                dic[line[1]]['value'] = False
-                        elif line[2] == "Int":
-                            dic[line[1]]['value'] = int(line[3])
-                        elif line[2] == "Float":
-                            dic[line[1]]['value'] = float(line[3])
-
-                    # load default value
-                    if len(line) >= 5:
-                        if line[2] == "Bool":
-                            if line[4] == 'True':
-                                dic[line[1]]['default'] = True
-                            else:
-                                dic[line[1]]['default'] = False
-                        elif line[2] == "Int":
-                            dic[line[1]]['default'] = int(line[4])
-                        elif line[2] == "Float":
-                            dic[line[1]]['default'] = float(line[4])
-
-                self.lst_prmt = lst
-                self.dic_prmt = dic
+            self.store = DataSheet.read_csv(os.path.join(_path, _file))
+            self.compile_plans()
 
         except IOError as e:
             return e.errno
@@ -649,117 +2603,1345 @@ class DataSheet:
             raise e
         return 0
 
-    def create(self, _file: str, _path: str = './') -> int:
+    @staticmethod
+    def read_csv(_file: str) -> PrmtStore:
         """
-        Create datasheet
-        :param _path: [optional] (String) file path that files are exist
-        :param _file: (String) file name that to load (svc format)
-        :return: (Int) errno more information see this page https://docs.python.org/3/library/errno.html
-
-        Data sheet information: [id | parameter_name | parameter_type | saved value | default value] 
+        (STATIC) parse csv sheet
+        :param _file: (String) csv file path
+        :return: (PrmtStore) parameters of sheet
         """
+        with open(_file, 'r') as f:
+            reader = csv.reader(f)
+
+            store = PrmtStore()
+            for line in reader:
+                if line[0] == 'ID':
+                    continue
+
+                value = 0
+                default = 0
+                refresh_class = RefreshClass.Normal
+
+                # load last state
+                if len(line) >= 4:
+                    if line[2] == "Bool":
+                        if line[3] == 'True':
+                            value = True
+                        else:
+                            value = False
+                    elif line[2] == "Int":
+                        value = int(line[3])
+                    elif line[2] == "Float":
+                        value = float(line[3])
+
+                # load default value
+                if len(line) >= 5:
+                    if line[2] == "Bool":
+                        if line[4] == 'True':
+                            default = True
+                        else:
+                            default = False
+                    elif line[2] == "Int":
+                        default = int(line[4])
+                    elif line[2] == "Float":
+                        default = float(line[4])
+
+                # load refresh class
+                if len(line) >= 6:
+                    if line[5] in RefreshClass.__members__:
+                        refresh_class = RefreshClass[line[5]]
+
+                store.append(line[1], int(line[0]), line[2], value, default, refresh_class)
+
+            return store
 
+    @staticmethod
+    def read_binary(_file: str) -> PrmtStore:
+        """
+        (STATIC) read binary sheet (memory mapped, no per row parsing)
+        :param _file: (String) bsheet file path
+        :raise ValueError: file is not a binary sheet, or it's truncated / corrupt
+        :return: (PrmtStore) parameters of sheet
+        """
         try:
-            os.makedirs(_path, exist_ok=True)
-            file = os.path.join(_path, _file)
-            with open(file, 'w', newline='') as f:
-                prmt = avatar_config.get()[2]
-                writer = csv.writer(f)
+            with open(_file, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return PrmtStore.unpack(mm)
+        except ValueError as e:
+            # mmap of an empty file and bad utf-8 names raise ValueError too
+            raise ValueError(f"{_file}: {e}") from e
 
-                # table header
-                writer.writerow(['ID', 'Parameter Name', 'Type', 'Saved Value', 'Default Value'])
+    @staticmethod
+    def convert(_file: str, _path: str, _to_binary: bool) -> int:
+        """
+        (STATIC) convert sheet between csv and binary format, csv can be edited by hand
 
-                i: int = 1
-                self.__recursive_DFS(prmt, writer, 1)
+        exported csv holds the changes in the journal too. imported csv replaces them, the journal is cleared
+        :param _file: (String) sheet file name (without extension)
+        :param _path: (String) sheet directory path
+        :param _to_binary: (Bool) True: csv -> bsheet, False: bsheet -> csv
+        :return: (Int) errno more information see this page https://docs.python.org/3/library/errno.html
+        """
+        csv_file = os.path.join(_path, _file + '.csv')
+        binary_file = os.path.join(_path, _file + '.bsheet')
+        journal = Journal(_file, _path)
 
-                print(Flag.Info.value + 'csv file has been created!')
+        try:
+            if _to_binary:
+                DataSheet.write_snapshot(DataSheet.read_csv(csv_file).pack(), binary_file)
+                journal.clear()
+            else:
+                store = DataSheet.read_binary(binary_file)
+                journal.replay(store)
+                DataSheet.write_rows(DataSheet.store_rows(store), csv_file)
         except IOError as e:
+            log.error("%s", e)
             return e.errno
-        except Exception as e:
-            raise e
+        except (ValueError, struct.error) as e:
+            log.warning("%s is broken: %s", _file, e)
+            return errno.EINVAL
+
+        log.info("%s has been converted", _file)
         return 0
 
-    def save(self, _file: str, _path: str = './') -> int:
-        try:
-            os.makedirs(_path, exist_ok=True)
-            file = os.path.join(_path, _file + '.csv')
-            with open(file, 'w', newline='') as f:
+    def load_binary(self, _file: str, _path: str = './') -> int:
+        """
+        Load binary datasheet (memory mapped, no per row parsing)
+        :param _path: [optional] (String) file path that files are exist
+        :param _file: (String) file name that to load (bsheet format)
+        :return: (Int) errno more information see this page https://docs.python.org/3/library/errno.html
+        """
+        try:
+            self.store = DataSheet.read_binary(os.path.join(_path, _file))
+            self.compile_plans()
+        except IOError as e:
+            return e.errno
+        except (ValueError, struct.error) as e:
+            log.warning("%s is broken: %s", _file, e)
+            return errno.EINVAL
+        return 0
+
+    def create(self, _file: str, _path: str = './', _prmt: dict = None) -> int:
+        """
+        Create datasheet
+        :param _path: [optional] (String) file path that files are exist
+        :param _file: (String) file name that to load (svc format)
+        :param _prmt: (Dictionary) avatar parameter tree
+        :raise ValueError: parameters are unknown, an empty sheet would be kept and cached
+        :return: (Int) errno more information see this page https://docs.python.org/3/library/errno.html
+
+        Data sheet information: [id | parameter_name | parameter_type | saved value | default value | refresh class]
+        """
+        if _prmt is None:
+            raise ValueError(f"parameters of {_file} are unknown, sheet is not created")
+
+        try:
+            os.makedirs(_path, exist_ok=True)
+            file = os.path.join(_path, _file)
+            with open(file, 'w', newline='') as f:
+                prmt = _prmt
                 writer = csv.writer(f)
 
-                writer.writerow(['ID', 'Parameter Name', 'Type', 'Saved Value', 'Default Value'])
-                for k, v in self.dic_prmt.items():
-                    writer.writerow([v['id'], k, v['type'], v['value'], v['default']])
+                # table header
+                writer.writerow(['ID', 'Parameter Name', 'Type', 'Saved Value', 'Default Value', 'Refresh Class'])
+
+                i: int = 1
+                self.__recursive_DFS(prmt, writer, 1)
+
+                log.info('csv file has been created!')
+        except IOError as e:
+            return e.errno
+        except Exception as e:
+            raise e
+        return 0
+
+    @staticmethod
+    def extension() -> str:
+        """
+        (STATIC) file extension of configured sheet format
+        :return: (String) '.bsheet' for binary, '.csv' otherwise
+        """
+        if config.sheet_format == 'binary':
+            return '.bsheet'
+        return '.csv'
+
+    @staticmethod
+    def store_rows(_store: PrmtStore) -> list:
+        """
+        (STATIC) csv rows of store
+        :param _store: (PrmtStore)
+        :return: (List) csv rows (without header)
+        """
+        return [[_store.ids[i], _store.names[i], _store.type(i), _store.get(i),
+                 _store.get_default(i), _store.refresh_class(i).value] for i in range(len(_store))]
+
+    def rows(self) -> list:
+        """
+        snapshot of sheet rows to be written
+        :return: (List) csv rows (without header)
+        """
+        return DataSheet.store_rows(self.store)
+
+    def snapshot(self):
+        """
+        snapshot of sheet in configured format
+        :return: (Bytes) binary sheet, (List) csv rows for csv format
+        """
+        if config.sheet_format == 'binary':
+            return self.store.pack()
+        return self.rows()
+
+    @staticmethod
+    def write_snapshot(_snapshot, _file: str):
+        """
+        (STATIC) write snapshot() to file atomically, safe to call outside of the event loop
+        :param _snapshot: (List / Bytes) from snapshot()
+        :param _file: (String) sheet file path
+        :return: NONE
+        """
+        if not isinstance(_snapshot, bytes):
+            DataSheet.write_rows(_snapshot, _file)
+            return
+
+        tmp = _file + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp, _file)
+
+    @staticmethod
+    def write_rows(_rows: list, _file: str):
+        """
+        (STATIC) write sheet rows to csv, replaces the file atomically so a crash never leaves half a sheet
+        safe to call outside of the event loop
+        :param _rows: (List) rows from rows()
+        :param _file: (String) csv file path
+        :return: NONE
+        """
+        tmp = _file + '.tmp'
+        with open(tmp, 'w', newline='') as f:
+            writer = csv.writer(f)
+
+            writer.writerow(['ID', 'Parameter Name', 'Type', 'Saved Value', 'Default Value', 'Refresh Class'])
+            writer.writerows(_rows)
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp, _file)
 
-            print(Flag.Info.value + "save csv complete")
+    def save(self, _file: str, _path: str = './') -> int:
+        started = time.perf_counter()
+        try:
+            os.makedirs(_path, exist_ok=True)
+            file = os.path.join(_path, _file + DataSheet.extension())
+            journal = self.journal
+            if journal is not None and journal.sheet_file == file:
+                # every change is in the sheet file now
+                snapshot, seq = self.snapshot(), journal.taken
+                journal.pending.clear()
+                journal.compact(snapshot, seq)
+            else:
+                DataSheet.write_snapshot(self.snapshot(), file)
+
+            metrics.sheet_io.observe(time.perf_counter() - started, ('save',))
+            log.info("save %s sheet complete", config.sheet_format)
         except IOError as e:
-            print(e)
+            log.error("%s", e)
             return e.errno
         except Exception as e:
             raise e
         return 0
 
-    def update(self, _file: str, _path: str = None):
+    async def flush_journal(self):
+        """
+        write pending changes to journal off the event loop, compact journal into csv when it grows too long
+        :return: NONE
+        """
+        journal = self.journal
+        if journal is None:
+            return
+
+        event_loop = asyncio.get_running_loop()
+
+        rows = journal.take(self.store)
+        if rows:
+            started = time.perf_counter()
+            await event_loop.run_in_executor(None, journal.write, rows)
+            metrics.sheet_io.observe(time.perf_counter() - started, ('journal',))
+
+        # sheet may have been switched while writing
+        if journal is self.journal and journal.entries >= config.journal_compact:
+            await event_loop.run_in_executor(None, journal.compact, self.snapshot(), journal.taken)
+
+    def update(self, _file: str, _path: str = None, _prmt: dict = None):
         """
         update / initialize sheet data
 
         :param _file: (String) file name
         :param _path: (String) file directory path
+        :param _prmt: (Dictionary) avatar parameter tree used when sheet has to be created
         :return: NONE
         """
         path = _path
+        started = time.perf_counter()
 
         if path is None:
             path = config.sheet_path
 
         file_name = _file + '.csv'
-        if self.load(file_name, path) == errno.ENOENT:
-            print(Flag.Info.value + f'{_file} not found create new one')
-            self.create(file_name, path)
+        if config.sheet_format == 'binary' and self.load_binary(_file + '.bsheet', path) == 0:
+            pass
+        elif self.load(file_name, path) == errno.ENOENT:
+            log.info('%s not found create new one', _file)
+            self.create(file_name, path, _prmt)
             self.load(file_name, path)
 
+        if config.sheet_format == 'binary' and not os.path.exists(os.path.join(path, _file + '.bsheet')):
+            # import csv sheet
+            self.save(_file, path)
+
+        # apply changes that were not compacted into csv yet (e.g. after crash)
+        self.journal = Journal(_file, path)
+        replayed = self.journal.replay(self.store)
+        if replayed:
+            log.info('%s changes restored from journal', replayed)
+
+        metrics.sheet_io.observe(time.perf_counter() - started, ('load',))
+
+    def compile_plans(self):
+        """
+        build send plan of every parameter that fits in id range
+
+        with config.bool_packing, packed bools have no plan of their own, their group plans
+        are appended after the parameters. (frame unit = parameter index or len(store) + group number)
+        frame of id N is carried by lane (N % config.lane_count())
+        :return: NONE
+        """
+        store = self.store
+        lanes = config.lane_count()
+        plans = list()
+        units = list()
+        for i in range(len(store)):
+            if store.ids[i] in range(0, 256):
+                plans.append(SendPlan(store.ids[i], store.type(i), _lane=store.ids[i] % lanes))
+            else:
+                plans.append(None)
+            units.append(i)
+
+        groups = list()
+        if config.bool_packing:
+            codec = BoolCodec(store, config.bool_group_base)
+            for group, i in codec.collisions.items():
+                log.warning("bool group %s is not packed, its id is used by %s", group, store.names[i])
+            for i in codec.unpacked:
+                if codec.base + store.ids[i] // 8 > 255:
+                    log.warning("%s can't be packed, group id is out of range (0 ~ 255)", store.names[i])
+
+            for group, members in sorted(codec.groups.items()):
+                unit = len(plans)
+                plans.append(SendPlan(group, 'Int', _lane=group % lanes))
+                groups.append(members)
+                for _, i in members:
+                    plans[i] = None
+                    units[i] = unit
+
+        self.plans = plans
+        self.units = units
+        self.groups = groups
+        self.lanes = [self.unit_id(u) % lanes for u in range(len(plans))]
+        self.plan_revision = config.revision
+
+    def get_plan(self, _u: int) -> SendPlan:
+        """
+        get send plan of frame unit, plans are rebuilt when config has been changed
+        :param _u: (Int) frame unit (parameter index or packed bool group)
+        :return: (SendPlan) send plan
+        """
+        if self.plan_revision != config.revision:
+            self.compile_plans()
+        return self.plans[_u]
+
+    def unit_of(self, _i: int) -> int:
+        """
+        get frame unit that carries parameter
+        :param _i: (Int) parameter index
+        :return: (Int) frame unit
+        """
+        return self.units[_i]
+
+    def unit_key(self, _u: int):
+        """
+        get what frame unit stands for, it stays the same when units are renumbered by an edit
+        :param _u: (Int) frame unit
+        :return: (String) parameter name, (Int) group id for packed bool group
+        """
+        if _u < len(self.store):
+            return self.store.names[_u]
+        return self.unit_id(_u)
+
+    def unit_id(self, _u: int) -> int:
+        """
+        get id that frame unit is sent with
+        :param _u: (Int) frame unit
+        :return: (Int) parameter id or group id
+        """
+        if _u < len(self.store):
+            return self.store.ids[_u]
+        return config.bool_group_base + self.store.ids[self.groups[_u - len(self.store)][0][1]] // 8
+
+    def lane_of(self, _u: int) -> int:
+        """
+        get sync lane that carries frame unit
+        :param _u: (Int) frame unit
+        :return: (Int) lane number
+        """
+        return self.lanes[_u]
+
+    def unit_value(self, _u: int):
+        """
+        get value to send of frame unit
+        :param _u: (Int) frame unit
+        :return: parameter value or bit mask of packed bool group
+        """
+        if _u < len(self.store):
+            return self.store.get(_u)
+        return BoolCodec.encode(self.store, self.groups[_u - len(self.store)])
+
+    def unit_class(self, _u: int) -> RefreshClass:
+        """
+        get refresh class of frame unit, a group is refreshed as often as its hottest bool
+        :param _u: (Int) frame unit
+        :return: (RefreshClass)
+        """
+        if _u < len(self.store):
+            return self.store.refresh_class(_u)
+        return min((self.store.refresh_class(i) for _, i in self.groups[_u - len(self.store)]),
+                   key=PrmtStore.CLASSES.index)
+
+    @property
+    def lst_prmt(self) -> list:
+        return self.store.names
+
+    @property
+    def dic_prmt(self) -> PrmtDictView:
+        return PrmtDictView(self.store)
+
     def get_prmt_list(self) -> list:
         return self.lst_prmt
 
-    def get_prmt_dict(self) -> dict:
+    def get_prmt_dict(self) -> PrmtDictView:
         return self.dic_prmt
 
 
-async def loop(PRINT_INFO = True):
-    print(Flag.Info.value + "START SENDING OSC")
+class Scheduler:
+    # frame intervals a dirty parameter of the class lets later changes of higher classes go first
+    AGING = {RefreshClass.Hot: 0, RefreshClass.Normal: 4, RefreshClass.Cold: 16}
+
+    def __init__(self, _sheet, _lane: int = 0, _client: str = ""):
+        """
+        Decide which sheet parameter loop() sends next.
+
+        there is one scheduler per sync lane, it only schedules frames carried by its lane.
+
+        changed (dirty) parameters always go first, ordered by refresh class (Hot, Normal, Cold) with aging:
+        a change is due at the time it was made plus AGING of its class (in frame intervals), the earliest goes first.
+        a Hot parameter that changes all the time can't starve Normal and Cold changes, they wait at most
+        their aging plus one frame per dirty parameter ahead of them.
+        unchanged parameters are only re-sent as keep-alive when their class interval expires,
+        so the staleness of a changed value depends on the number of dirty parameters, not the sheet size.
+
+        changes of one parameter are coalesced (last write wins), a parameter is sent
+        at most once per config.coalesce_window, later changes wait in deferred until the window ends.
+        :param _sheet: (DataSheet) sheet to schedule
+        :param _lane: (Optional) sync lane
+        :param _client: (Optional) name of VRChat client, metric label
+        """
+        self.lane: int = _lane
+        self.keepalive: bool = False
+        self.labels: tuple = (_client, str(_lane))
+        self.cycle: set = set()
+        self.cycle_start: float = 0.0
+        self.classes: dict = dict()
+        self.dirty: dict = dict()
+        self.due: dict = dict()
+        self.queue: list = list()
+        self.last_sent: dict = dict()
+        self.deferred: dict = dict()
+        self.deferred_queue: list = list()
+        self.event = asyncio.Event()
+
+        self.rebuild(_sheet)
+
+    def rebuild(self, _sheet):
+        """
+        reset schedule for (new) sheet, every parameter is due for one keep-alive right away
+        :param _sheet: (DataSheet) sheet to schedule
+        :return: NONE
+        """
+        now = time.monotonic()
+
+        self.classes = dict()
+        self.dirty = {c: dict() for c in RefreshClass}
+        self.due = dict()
+        self.queue = list()
+        self.last_sent = dict()
+        self.deferred = dict()
+        self.deferred_queue = list()
+        self.cycle = set()
+        self.cycle_start = now
+
+        if _sheet.plan_revision != config.revision:
+            _sheet.compile_plans()
+        for u, plan in enumerate(_sheet.plans):
+            if plan is not None and _sheet.lane_of(u) == self.lane:
+                self.classes[u] = _sheet.unit_class(u)
+                self.due[u] = now
+                self.queue.append((now, u))
+
+        heapq.heapify(self.queue)
+        self.event.set()
+
+    def remap(self, _sheet, _keys: list, _changed: set):
+        """
+        move schedule to edited sheet (hot reload), unlike rebuild() nothing is sent again just because of the edit.
+        units that are still in the sheet keep their keep-alive time and pending changes,
+        only new units and units whose frame has changed are marked dirty.
+        :param _sheet: (DataSheet) edited sheet
+        :param _keys: (List) unit key of every frame unit before the edit, from DataSheet.frames()
+        :param _changed: (Set) keys of units whose frame has changed
+        :return: NONE
+        """
+        now = time.monotonic()
+        old = {key: u for u, key in enumerate(_keys)}
+        due = self.due
+        last_sent = self.last_sent
+        pending = {_keys[u] for c in RefreshClass for u in self.dirty[c]} | {_keys[u] for u in self.deferred}
+
+        self.classes = dict()
+        self.dirty = {c: dict() for c in RefreshClass}
+        self.due = dict()
+        self.queue = list()
+        self.last_sent = dict()
+        self.deferred = dict()
+        self.deferred_queue = list()
+        self.cycle = set()
+
+        if _sheet.plan_revision != config.revision:
+            _sheet.compile_plans()
+        dirty = list()
+        for u, plan in enumerate(_sheet.plans):
+            if plan is None or _sheet.lane_of(u) != self.lane:
+                continue
+
+            key = _sheet.unit_key(u)
+            o = old.get(key)
+            self.classes[u] = _sheet.unit_class(u)
+            if o in due:
+                self.due[u] = due[o]
+                if o in last_sent:
+                    self.last_sent[u] = last_sent[o]
+            else:
+                # new in this lane, sent as dirty below
+                self.due[u] = now + self.__interval(self.classes[u])
+            self.queue.append((self.due[u], u))
+
+            if o not in due or key in _changed or key in pending:
+                dirty.append(u)
+
+        heapq.heapify(self.queue)
+        for u in dirty:
+            self.mark_dirty(u)
+        self.event.set()
+
+    def __interval(self, _class: RefreshClass) -> float:
+        """
+        (PRIVATE) keep-alive interval of refresh class
+        :param _class: (RefreshClass)
+        :return: (Float) interval in seconds
+        """
+        if _class == RefreshClass.Hot:
+            return config.keepalive_hot
+        elif _class == RefreshClass.Cold:
+            return config.keepalive_cold
+        else:
+            return config.keepalive_normal
+
+    def __sent(self, _i: int, _now: float):
+        """
+        (PRIVATE) push back next keep-alive of parameter
+        :param _i: (Int) parameter index
+        :param _now: (Float) monotonic time of sending
+        :return: NONE
+        """
+        due = _now + self.__interval(self.classes[_i])
+        self.due[_i] = due
+        last = self.last_sent.get(_i)
+        self.last_sent[_i] = _now
+        heapq.heappush(self.queue, (due, _i))
+
+        if last is not None:
+            metrics.frame_staleness.observe(_now - last, self.labels)
+
+        self.cycle.add(_i)
+        if len(self.cycle) >= len(self.classes):
+            metrics.cycle_time.set(_now - self.cycle_start, self.labels)
+            self.cycle.clear()
+            self.cycle_start = _now
+
+    def mark_dirty(self, _i: int) -> bool:
+        """
+        mark parameter as changed
+        :param _i: (Int) parameter index
+        :return: (Bool) False if the change was coalesced into a pending frame
+        """
+        if _i not in self.classes:
+            return False
+
+        c = self.classes[_i]
+        if _i in self.dirty[c] or _i in self.deferred:
+            return False
+
+        ready = self.last_sent.get(_i, 0.0) + config.coalesce_window
+        if ready > time.monotonic():
+            self.deferred[_i] = ready
+            heapq.heappush(self.deferred_queue, (ready, _i))
+        else:
+            # dirty parameter -> time it became dirty
+            self.dirty[c][_i] = time.monotonic()
+
+        self.event.set()
+        return True
+
+    def next(self):
+        """
+        pop parameter that have to be sent now, self.keepalive tells whether it is only a keep-alive
+        :return: (Int) parameter index, None if nothing is due
+        """
+        now = time.monotonic()
+        self.keepalive = False
+
+        while self.deferred_queue and self.deferred_queue[0][0] <= now:
+            ready, prmt = heapq.heappop(self.deferred_queue)
+            if self.deferred.pop(prmt, None) is not None:
+                self.dirty[self.classes[prmt]][prmt] = ready
+
+        # oldest change of every class, the one with the earliest aged time goes first (Hot on ties)
+        first = None
+        for c in RefreshClass:
+            if self.dirty[c]:
+                prmt, since = next(iter(self.dirty[c].items()))
+                due = since + Scheduler.AGING[c] * config.frame_interval
+                if first is None or due < first[0]:
+                    first = (due, c, prmt)
+
+        if first is not None:
+            _, c, prmt = first
+            del self.dirty[c][prmt]
+            self.__sent(prmt, now)
+            return prmt
+
+        while self.queue and self.queue[0][0] <= now:
+            due, prmt = heapq.heappop(self.queue)
+            # skip entries that were pushed back by a dirty send
+            if self.due.get(prmt) != due:
+                continue
+            self.__sent(prmt, now)
+            self.keepalive = True
+            return prmt
+
+        return None
+
+    async def wait(self):
+        """
+        wait until a parameter becomes dirty or the next keep-alive / deferred change is due
+        :return: NONE
+        """
+        due = [q[0][0] for q in (self.queue, self.deferred_queue) if q]
+
+        timeout = None
+        if due:
+            timeout = max(min(due) - time.monotonic(), 0)
+
+        self.event.clear()
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class Pacer:
+    def __init__(self):
+        """
+        Adjust frame interval of one sync lane to the fastest rate VRChat actually applies.
+
+        every sent id is expected to be echoed back before the next frame of the lane.
+        echoed frame shortens the interval by 5%, missing echo lengthens it by 50%,
+        always within config.pacing_min ~ config.pacing_max.
+        until the first echo arrives (e.g. avatar has no OSCPI parameters) config.frame_interval is kept.
+        """
+        self.interval: float = config.frame_interval
+        self.rtt: float = None
+        # id -> monotonic time of sending, frames that are not echoed yet
+        self.pending: OrderedDict = OrderedDict()
+        self.last_id: int = None
+        self.seen: bool = False
+
+    def sent(self, _id: int):
+        """
+        record sent frame
+        :param _id: (Int) id of frame
+        :return: NONE
+        """
+        # VRChat only reports changed values, the same id twice in a row is never echoed
+        if _id == self.last_id:
+            return
+
+        if self.seen and self.last_id in self.pending:
+            # previous frame was not echoed in time
+            self.interval = min(self.interval * 1.5, config.pacing_max)
+
+        self.pending[_id] = time.monotonic()
+        self.pending.move_to_end(_id)
+        if len(self.pending) > 16:
+            self.pending.popitem(last=False)
+        self.last_id = _id
+
+    def echo(self, _id: int):
+        """
+        record echoed id
+        :param _id: (Int) id reported by VRChat
+        :return: NONE
+        """
+        sent = self.pending.pop(_id, None)
+        if sent is None:
+            return
+
+        rtt = time.monotonic() - sent
+        self.rtt = rtt if self.rtt is None else self.rtt * 0.875 + rtt * 0.125
+        self.seen = True
+
+        # older frames will not be echoed anymore
+        while self.pending and next(iter(self.pending.values())) < sent:
+            self.pending.popitem(last=False)
+
+        if _id == self.last_id:
+            self.interval = min(max(self.interval * 0.95, config.pacing_min, self.rtt), config.pacing_max)
+        else:
+            # echoed after the next frame had been sent already
+            self.interval = min(max(self.interval, self.rtt), config.pacing_max)
+
+    def delay(self) -> float:
+        """
+        get time to wait before next frame
+        :return: (Float) seconds
+        """
+        if not config.pacing:
+            return config.frame_interval
+        return self.interval
+
+
+class VRChatClient:
+    sender_class: type = Sender
+    scheduler_class: type = Scheduler
+
+    def __init__(self, _name: str, _port: int):
+        """
+        One running VRChat client and everything OSCPI keeps for it (avatar, sheet, send queue, sync lanes).
+
+        every client runs its own tasks on the one event loop, load() is blocking and runs in executor.
+        :param _name: (String) OSCQuery service name of client
+        :param _port: (Int) OSCQuery (http) port of client
+        """
+        self.name = _name
+        self.port = _port
+        # where the client listens for OSC (HOST_INFO), config.client_port is used if it is unknown
+        self.host_osc_port: int = None
+
+        self.avatar_config: AvatarConfig = None
+        self.sheet: DataSheet = None
+        self.sender: Sender = None
+        self.schedulers: list = list()
+        self.pacers: list = list()
+        self.switcher: AvatarSwitcher = None
+        self.table: SharedTable = None
+        self.router: RouteDispatcher = None
+        self.tasks: list = list()
+        self.lane_tasks: list = list()
+
+    def osc_address(self) -> tuple:
+        """
+        get address that frames are sent to
+        :return: (Tuple) (ip, port)
+        """
+        port = self.host_osc_port if self.host_osc_port is not None else config.client_port
+        return config.ip_addr, port
+
+    def load(self):
+        """
+        read OSC port and current avatar of client, load its sheet (blocking)
+        :return: NONE
+        """
+        try:
+            response = requests.get(f"http://127.0.0.1:{self.port}/HOST_INFO", timeout=2)
+            self.host_osc_port = response.json()['OSC_PORT']
+        except (requests.RequestException, ValueError, KeyError, TypeError):
+            log.warning("OSC port of %s is unknown, %s is used", self.name, config.client_port)
+
+        self.avatar_config = AvatarConfig(self)
+        self.sheet = DataSheet(self.avatar_config.avatar_name, config.sheet_path, self.avatar_config.avatar_prmt)
+
+    def start(self, _table: SharedTable = None):
+        """
+        start sending to client (on the event loop)
+        :param _table: (Optional) publish sheet in this shared memory table
+        :return: NONE
+        """
+        self.sender = VRChatClient.sender_class(*self.osc_address(), config.bundle, config.send_queue_size)
+        self.switcher = AvatarSwitcher(self)
+
+        if _table is not None:
+            self.table = _table
+            self.table.publish(self.sheet.store)
+
+        metrics.parameters.set(len(self.sheet.store), (self.name,))
+
+        tasks = [journal_loop(self)]
+        if self.table is not None:
+            tasks.append(table_loop(self))
+        self.tasks = [self.sender.start()] + [asyncio.ensure_future(t) for t in tasks]
+        self.relane()
+
+        # routes last, nothing is dispatched to the client before it runs
+        self.router = Receiver.build_dispatcher(self)
+
+    def relane(self):
+        """
+        (re)start one scheduler, pacer and loop() per sync lane (on the event loop)
+        :return: NONE
+        """
+        for task in self.lane_tasks:
+            task.cancel()
+
+        self.schedulers = [VRChatClient.scheduler_class(self.sheet, k, self.name) for k in range(config.lane_count())]
+        self.pacers = [Pacer() for _ in range(config.lane_count())]
+        self.lane_tasks = [asyncio.ensure_future(loop(self, PRINT_INFO=False, _lane=k))
+                           for k in range(config.lane_count())]
+
+    def retarget(self):
+        """
+        apply network config to sender
+        :return: NONE
+        """
+        self.sender.bundle = config.bundle
+        self.sender.queue_size = config.send_queue_size
+        if self.sender.address != self.osc_address():
+            self.sender.update(*self.osc_address())
+
+    def apply(self, _before: list, _store: 'PrmtStore' = None):
+        """
+        apply edited sheet or config to the running client (on the event loop)
+
+        current values are kept, only new frame units and units whose id, type, lane or addresses
+        have changed are marked dirty. a changed number of sync lanes restarts every lane.
+        :param _before: (List) sheet.frames() before the edit
+        :param _store: (Optional) edited parameters of sheet, None if only config has changed
+        :return: NONE
+        """
+        sheet = self.sheet
+        if _store is not None:
+            # pending changes refer to old indices
+            rows = sheet.journal.take(sheet.store)
+            background(asyncio.get_running_loop().run_in_executor(None, sheet.journal.write, rows),
+                       f"journal write of {sheet.journal.file}")
+            sheet.replace(_store)
+            if self.table is not None:
+                self.table.publish(sheet.store)
+
+        before = dict(_before)
+        changed = {key for key, frame in sheet.frames() if before.get(key) != frame}
+
+        if len(self.schedulers) != config.lane_count():
+            self.relane()
+        else:
+            keys = [key for key, _ in _before]
+            for scheduler in self.schedulers:
+                scheduler.remap(sheet, keys, changed)
+        Receiver.rebuild_routes(self)
+
+        metrics.parameters.set(len(sheet.store), (self.name,))
+        log.info("%s: %s parameters, %s frames changed", self.avatar_config.avatar_name, len(sheet.store), len(changed))
+
+    async def reload(self):
+        """
+        read edited sheet file of current avatar and apply it
+        :return: NONE
+        """
+        sheet = self.sheet
+        file = sheet.journal.sheet_file
+        reader = DataSheet.read_binary if file.endswith('.bsheet') else DataSheet.read_csv
+        try:
+            store = await asyncio.get_running_loop().run_in_executor(None, reader, file)
+        except (IOError, ValueError, IndexError, struct.error) as e:
+            log.warning("%s could not be reloaded: %s", file, e)
+            return
+
+        if self.sheet is not sheet or self.router is None:
+            # avatar has been changed or client has gone meanwhile
+            return
+        log.info("%s has been edited", file)
+        self.apply(sheet.frames(), store)
+
+    def stop(self):
+        """
+        stop tasks of client (on the event loop)
+        :return: NONE
+        """
+        self.router = None
+        for task in self.tasks + self.lane_tasks:
+            task.cancel()
+        if self.sender is not None and self.sender.task is not None:
+            # writer may have been restarted
+            self.sender.task.cancel()
+        if self.switcher is not None and self.switcher.task is not None:
+            self.switcher.task.cancel()
+
+    def close(self):
+        """
+        remove shared memory table and save sheet and cached sheets, their journals are compacted (blocking)
+        :return: NONE
+        """
+        if self.table is not None:
+            self.table.close()
+            self.table = None
+        if self.sheet is not None:
+            self.sheet.save(self.avatar_config.avatar_name, config.sheet_path)
+        if self.switcher is not None:
+            for info, sheet in self.switcher.cache.entries.values():
+                if sheet is not self.sheet:
+                    sheet.save(info[1], config.sheet_path)
+
+    def get_current_avatar(self) -> str:
+        """
+        get current avatar id
+        :return: (String) Avatar ID
+        """
+
+        while True:
+            response = requests.get(f"http://127.0.0.1:{self.port}/avatar/change")
+
+            if response.status_code == 200:
+                json_data = response.json()
+                return json_data['VALUE'][0]
+
+            time.sleep(1)
+
+    def get_avatar_prmt(self) -> dict:
+        """
+        get current avatar's parameters
+        :raise requests.RequestException: client doesn't answer or refuses the request
+        :return: (Dictionary) parameters
+        """
+        response = requests.get(f"http://127.0.0.1:{self.port}/avatar/parameters", timeout=2)
+        response.raise_for_status()
+        return response.json()
+
+    def get_value(self, _address: str):
+        """
+        get current value of OSC address (blocking)
+        :param _address: (String) OSC address
+        :return: value, None if client doesn't report it
+        """
+        try:
+            response = requests.get(f"http://127.0.0.1:{self.port}{_address}", timeout=0.5)
+            return response.json()['VALUE'][0]
+        except (requests.RequestException, ValueError, KeyError, IndexError, TypeError):
+            return None
+
+
+class Tracer:
+    STAGES = ('dispatch', 'schedule', 'send', 'total')
+
+    def __init__(self, _size: int = 10000):
+        """
+        End-to-end latency of inbound changes (--trace), kept in a bounded ring buffer.
+
+        dispatch: packet handed to dispatcher -> parameter marked dirty
+        schedule: marked dirty -> picked by loop() (coalescing window, other dirty frames, pacing)
+        send: picked -> frame datagrams written by the send queue writer
+        changes that are coalesced into one frame are traced from the earliest one.
+
+        only the Trace* classes call it, without --trace the normal classes run untouched.
+        :param _size: (Int) number of traces to keep
+        """
+        self.ring: deque = deque(maxlen=_size)
+        self.packet: tuple = None
+        self.pending: dict = dict()
+        # SendPlan -> trace, frames that have been picked but not written yet
+        self.picked: dict = dict()
+        self.started: float = time.perf_counter()
+
+    def received(self, _address: str):
+        self.packet = (time.perf_counter(), _address)
+
+    def done(self):
+        self.packet = None
+
+    def handled(self, _key: tuple):
+        """
+        parameter of current packet has been marked dirty
+        :param _key: (Tuple) (Scheduler, frame unit)
+        :return: NONE
+        """
+        if self.packet is None:
+            return
+
+        trace = self.pending.get(_key)
+        if trace is None:
+            self.pending[_key] = [self.packet[0], time.perf_counter(), self.packet[1], 0]
+        else:
+            trace[3] += 1
+
+    def picked_up(self, _key: tuple, _plan: SendPlan):
+        trace = self.pending.pop(_key, None)
+        if trace is not None:
+            self.picked[_plan] = (trace, time.perf_counter(), _key[0].lane)
+
+    def sent(self, _plan: SendPlan):
+        picked = self.picked.pop(_plan, None)
+        if picked is None:
+            return
+
+        (received, handled, address, coalesced), picked, lane = picked
+        self.ring.append((received, handled, picked, time.perf_counter(), address, coalesced, lane))
+
+    def summary(self) -> str:
+        """
+        per stage latency of traced changes
+        :return: (String) summary table (milliseconds)
+        """
+        stages = {stage: list() for stage in Tracer.STAGES}
+        for received, handled, picked, sent, _, _, _ in self.ring:
+            stages['dispatch'].append(handled - received)
+            stages['schedule'].append(picked - handled)
+            stages['send'].append(sent - picked)
+            stages['total'].append(sent - received)
+
+        lines = [f"{len(self.ring)} traced changes (ms)", "stage        p50      p95      p99      max"]
+        for stage, samples in stages.items():
+            if not samples:
+                continue
+            samples.sort()
+            p = [samples[min(int(len(samples) * q), len(samples) - 1)] * 1000 for q in (0.5, 0.95, 0.99)]
+            lines.append(f"{stage:<8} {p[0]:8.3f} {p[1]:8.3f} {p[2]:8.3f} {samples[-1] * 1000:8.3f}")
+        return "\n".join(lines)
+
+    def dump(self, _file: str) -> int:
+        """
+        write traces as Chrome trace event json (chrome://tracing, Perfetto)
+        :param _file: (String) file path
+        :return: (Int) errno more information see this page https://docs.python.org/3/library/errno.html
+        """
+        events = list()
+        for received, handled, picked, sent, address, coalesced, lane in self.ring:
+            args = {"address": address, "coalesced": coalesced}
+            for name, start, end in (('dispatch', received, handled), ('schedule', handled, picked), ('send', picked, sent)):
+                events.append({
+                    "name": name, "cat": "oscpi", "ph": "X", "pid": 1, "tid": lane,
+                    "ts": (start - self.started) * 1e6, "dur": (end - start) * 1e6, "args": args
+                })
+
+        try:
+            with open(_file, 'w', encoding='utf-8') as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        except IOError as e:
+            return e.errno
+        return 0
+
+
+class TraceDispatcher(RouteDispatcher):
+    def call_fast(self, data: bytes, client_address):
+        tracer.received(data[:data.find(b'\x00')].decode('utf-8', 'replace'))
+        try:
+            super().call_fast(data, client_address)
+        finally:
+            tracer.done()
+
+    def handlers_for_address(self, address_pattern: str):
+        if tracer.packet is not None:
+            tracer.packet = (tracer.packet[0], address_pattern)
+        return super().handlers_for_address(address_pattern)
+
+
+class TraceScheduler(Scheduler):
+    def rebuild(self, _sheet):
+        self.sheet = _sheet
+        super().rebuild(_sheet)
+
+    def mark_dirty(self, _i: int) -> bool:
+        result = super().mark_dirty(_i)
+        tracer.handled((self, _i))
+        return result
+
+    def next(self):
+        u = super().next()
+        if u is not None:
+            tracer.picked_up((self, u), self.sheet.get_plan(u))
+        return u
+
+
+class TraceSender(Sender):
+    def send_plan(self, _plan: SendPlan, _value, PRINT_INFO: bool = True):
+        if super().send_plan(_plan, _value, PRINT_INFO):
+            tracer.sent(_plan)
+            return True
+        return False
+
+
+def background(_future, _what: str) -> asyncio.Future:
+    """
+    run coroutine or executor future without awaiting it, its failure is logged instead of being lost
+    :param _future: coroutine or future
+    :param _what: (String) what it does, for the log
+    :return: (Future) scheduled future
+    """
+    future = asyncio.ensure_future(_future)
+
+    def done(_f: asyncio.Future):
+        if not _f.cancelled() and _f.exception() is not None:
+            log.error("%s has failed: %r", _what, _f.exception())
+
+    future.add_done_callback(done)
+    return future
+
+
+async def loop(_client: VRChatClient, PRINT_INFO = True, _lane: int = 0):
+    log.info("START SENDING OSC (%s, lane %s)", _client.name, _lane)
+    scheduler = _client.schedulers[_lane]
+    pacer = _client.pacers[_lane]
+    sender = _client.sender
+    labels = (_client.name, str(_lane))
 
     while(True):
-        for k, v in sheet.dic_prmt.items():
-            if v['id'] in range(0, 256):
-                # <SEND NORMAL MODE PARAMETERS>
-                if v['type'] == 'Bool':
-                    await sender.send(v['value'], config.prmt_bool_out, PRINT_INFO=PRINT_INFO)
-                elif v['type'] == 'Int':
-                    await sender.send(v['value'], config.prmt_int_out, PRINT_INFO=PRINT_INFO)
-                else:
-                    # default (float)
-                    await sender.send(v['value'], config.prmt_float_out, PRINT_INFO=PRINT_INFO)
-                # </SEND NORMAL MODE PARAMETERS>
-
-                # SEND LIGHT MODE PARAMETER
-                if v['type'] == 'Int':
-                    await sender.send(float(v['value'] / 255), config.prmt_out_light, PRINT_INFO=PRINT_INFO)
-                else:
-                    await sender.send(float(v['value']), config.prmt_out_light, PRINT_INFO=PRINT_INFO)
-                # SEND ID
-                await sender.send(v['id'], config.prmt_id, PRINT_INFO=PRINT_INFO)
-
-                await asyncio.sleep(0.1)
+        i = scheduler.next()
+        if i is None:
+            await scheduler.wait()
+            continue
+
+        # sheet changes with avatar
+        sheet = _client.sheet
+        sender.send_frame(sheet.get_plan(i), sheet.unit_value(i), scheduler.keepalive, PRINT_INFO=PRINT_INFO)
+        pacer.sent(sheet.unit_id(i))
+        metrics.frames_sent.inc(1, labels)
+        metrics.pacing_interval.set(pacer.delay(), labels)
+        if pacer.rtt is not None:
+            metrics.pacing_rtt.set(pacer.rtt, labels)
+        await asyncio.sleep(pacer.delay())
+
+
+async def table_loop(_client: VRChatClient):
+    """
+    apply values that other processes have written into the shared memory table of client
+    :param _client: (VRChatClient)
+    :return: NONE
+    """
+    while True:
+        await asyncio.sleep(config.shared_memory_interval)
+        for i, value in _client.table.poll():
+            # same path as a change from VRChat
+            Receiver.prmt_handler(_client, i, "shared memory", value)
+
+
+async def journal_loop(_client: VRChatClient):
+    while True:
+        await asyncio.sleep(config.journal_interval)
+        await _client.sheet.flush_journal()
+
+
+async def lag_loop(_interval: float = 0.5):
+    """
+    measure how late the event loop wakes up a sleeping task
+    :param _interval: (Float) seconds between measurements
+    :return: NONE
+    """
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(_interval)
+        metrics.loop_lag.observe(max(time.monotonic() - started - _interval, 0.0))
+
+
+def open_table(_tries: int = 16) -> SharedTable:
+    """
+    create shared memory table for next client, config name for the first one, numbered for the others.
+    names that another OSCPI process uses are skipped
+    :param _tries: (Optional) max number of names to try
+    :return: (SharedTable) table, None if shared memory is disabled or no name is free
+    """
+    if not config.shared_memory:
+        return None
+
+    used = {c.table.memory.name.lstrip('/') for c in clients.values() if c.table is not None}
+    name, n = config.shared_memory_name, 1
+    while n <= _tries:
+        if name not in used:
+            try:
+                return SharedTable(name, config.shared_memory_capacity)
+            except FileExistsError as e:
+                log.warning("%s, next name is tried", e)
+        n += 1
+        name = f"{config.shared_memory_name}-{n}"
+
+    log.error("shared memory table could not be created, %s names are in use", _tries)
+    return None
+
+
+async def add_client(_port: int, _name: str):
+    """
+    load and start VRChat client that has been found
+    :param _port: (Int) OSCQuery port of client
+    :param _name: (String) OSCQuery service name of client
+    :return: NONE
+    """
+    client = VRChatClient(_name, _port)
+    clients[_port] = client
+    if receiver is not None:
+        receiver.unpair_assumed()
+
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, client.load)
+    except Exception as e:
+        # a client that is not loaded must not stay, pairing takes it for a running one
+        log.error("VRChat client %s could not be loaded: %r", _name, e)
+        if clients.get(_port) is client:
+            del clients[_port]
+        return
+
+    if clients.get(_port) is not client:
+        # has gone while loading
+        return
+
+    client.start(open_table())
+    log.info("VRChat client has been added: %s (%s, OSC %s)", _name, client.avatar_config.avatar_name, client.osc_address()[1])
+
+
+def remove_client(_port: int):
+    """
+    stop VRChat client that has gone, its sheet is saved in executor
+    :param _port: (Int) OSCQuery port of client
+    :return: NONE
+    """
+    client = clients.pop(_port, None)
+    if client is None:
+        return
+
+    client.stop()
+    receiver.forget(client)
+    background(asyncio.get_running_loop().run_in_executor(None, client.close), f"closing {client.name}")
+    metrics.parameters.values.pop((client.name,), None)
+
+
+def reload_config():
+    """
+    load edited config.json and apply it to running clients
+    :return: NONE
+    """
+    try:
+        fresh = Config()
+        fresh.validate()
+    except (ValueError, KeyError, TypeError) as e:
+        log.warning("%s could not be reloaded, current config is kept: %s", Config.FILE, e)
+        return
+
+    running = [c for c in clients.values() if c.router is not None]
+    before = [c.sheet.frames() for c in running]
+    previous = config.todict()
+
+    # same object everywhere, plans are rebuilt for the new revision
+    fresh.revision = config.revision + 1
+    vars(config).update(vars(fresh))
+    log.setLevel(config.log_level)
+    log.info("%s has been reloaded", Config.FILE)
+
+    current = config.todict()
+    for section, key in Config.RESTART:
+        if previous[section][key] != current[section][key]:
+            log.warning("%s.%s takes effect after restart", section, key)
+
+    for client, frames in zip(running, before):
+        try:
+            client.retarget()
+            client.apply(frames)
+        except Exception as e:
+            log.error("config could not be applied to %s: %r", client.name, e)
 
-        if PRINT_INFO:
-            print("\n")
+
+async def reload_blacklist():
+    """
+    apply edited blacklist to sheets of running clients, edited sheets are written at once
+    :return: NONE
+    """
+    event_loop = asyncio.get_running_loop()
+    log.info("%s has been edited", config.blacklist_path)
+
+    for client in [c for c in clients.values() if c.router is not None]:
+        sheet = client.sheet
+        store = await event_loop.run_in_executor(None, sheet.apply_blacklist, client.avatar_config.avatar_prmt)
+        if store is None or client.sheet is not sheet or client.router is None:
+            continue
+
+        client.apply(sheet.frames(), store)
+        # cached sheets of other avatars are opened again with the new blacklist
+        client.switcher.cache.entries.clear()
+        background(event_loop.run_in_executor(None, sheet.journal.compact, sheet.snapshot(), sheet.journal.taken),
+                   f"compaction of {sheet.journal.file}")
+
+
+async def reload_loop():
+    """
+    watch config, blacklist and sheets of current avatars, apply only what has been edited
+
+    reload_interval 0 turns it off, config is still checked every second so it can be turned on again.
+    :return: NONE
+    """
+    watcher = FileWatcher()
+
+    while True:
+        try:
+            if watcher.changed(Config.FILE):
+                reload_config()
+
+            if config.reload_interval > 0:
+                if watcher.changed(config.blacklist_path):
+                    await reload_blacklist()
+
+                for client in list(clients.values()):
+                    if client.router is None:
+                        continue
+                    # sheet files OSCPI has written itself are skipped
+                    file = client.sheet.journal.sheet_file
+                    if watcher.changed(file) and FileWatcher.signature(file) != client.sheet.journal.written:
+                        await client.reload()
+        except Exception as e:
+            # a failed reload never stops OSCPI, the file is tried again when it's edited again
+            log.error("hot reload has failed: %r", e)
+
+        await asyncio.sleep(config.reload_interval if config.reload_interval > 0 else 1.0)
 
 
 async def main():
-    d = Receiver.build_dispatcher()
-    receiver = Receiver(d, config.ip_addr, oscq.get_osc_port())
+    global receiver
+    receiver = Receiver(config.ip_addr, oscq.get_osc_port())
     transport = await receiver.start()
 
-    await asyncio.gather(loop(PRINT_INFO=False))
+    def added(_port: int, _name: str):
+        asyncio.ensure_future(add_client(_port, _name))
+
+    found = oscq.watch(asyncio.get_running_loop(), added, remove_client)
+    await asyncio.gather(*[add_client(port, name) for port, name in found.items()])
+
+    await asyncio.gather(lag_loop(), reload_loop())
 
     transport.close()
 
@@ -767,18 +3949,52 @@ async def main():
 # Press the green button in the gutter to run the script.
 
 if __name__ == '__main__':
-    oscq = OSCQuery()
-    config = Config()
-
-    avatar_config = AvatarConfig()
-    sheet = DataSheet(avatar_config.avatar_name)
+    parser = argparse.ArgumentParser(description=f"OSC Parameter Increaser {Version}")
+    parser.add_argument('--export-csv', metavar='SHEET', help="write binary sheet as csv (to edit by hand) and exit")
+    parser.add_argument('--import-csv', metavar='SHEET', help="write csv sheet as binary sheet and exit")
+    parser.add_argument('--trace', metavar='FILE', nargs='?', const='trace.json',
+                        help="trace latency of inbound changes, write summary and Chrome trace json (default trace.json) on exit")
+    args = parser.parse_args()
+
+    start_logging()
+    try:
+        config = Config()
+        config.validate()
+    except (ValueError, KeyError, TypeError) as e:
+        # config.json is not overwritten, fix it and start again
+        log.error("%s could not be loaded: %s", Config.FILE, e)
+        sys.exit(errno.EINVAL)
+    log.setLevel(config.log_level)
+
+    if args.export_csv is not None:
+        sys.exit(DataSheet.convert(args.export_csv, config.sheet_path, False))
+    if args.import_csv is not None:
+        sys.exit(DataSheet.convert(args.import_csv, config.sheet_path, True))
+
+    tracer = None
+    if args.trace is not None:
+        tracer = Tracer()
+        Receiver.dispatcher_class = TraceDispatcher
+        VRChatClient.scheduler_class = TraceScheduler
+        VRChatClient.sender_class = TraceSender
+
+    # OSCQuery port of VRChat client -> VRChatClient
+    clients: dict = dict()
+    receiver: Receiver = None
 
-    sender = Sender()
+    oscq = OSCQuery()
 
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
         pass
-
-    sheet.save(avatar_config.avatar_name, config.sheet_path)
-    config.save()
+    finally:
+        # sheets are saved and shared memory is removed even if main() has failed
+        for client in clients.values():
+            client.close()
+        config.save()
+
+    if tracer is not None:
+        log.info("trace summary\n%s", tracer.summary())
+        if tracer.dump(args.trace) == 0:
+            log.info("trace has been written to %s", args.trace)
@@ -0,0 +1,369 @@
+"""
+Shared memory parameter table of OSCPI
+
+OSCPI publishes the values of the active sheet in a shared memory segment (config.json SHARED_MEMORY),
+other processes on the same machine read and write them with SharedTableClient, without OSC traffic.
+
+layout (native byte order, every column starts at 8 byte aligned offset, capacity = max parameters)
+    header    | magic (8s) | version (H) | name size (H) | capacity (I) | count (I) | generation (I) | seq (Q) | owner (I) |
+    names     | capacity * name size bytes, utf-8, '\\0' padded
+    ids       | capacity * int32
+    types     | capacity * uint8 (0: Int, 1: Float, 2: Bool, 3: UNKNOWN)
+    values    | capacity * double, current value, written by OSCPI only
+    requests  | capacity * double, value requested by a client, OSCPI clamps it to the VRChat range of the type
+              | (Int: 0 ~ 255 rounded, Float: -1.0 ~ 1.0, Bool: 0 / 1) and ignores nan / inf
+    req_seq   | capacity * uint32, client increments it after writing request
+
+seq is a seqlock around names / ids / types / count: odd while OSCPI rewrites them (avatar change),
+readers retry when seq was odd or changed during the read. generation increases with every new sheet.
+owner is the pid of the OSCPI process, a table left behind is reclaimed only when its owner is not running.
+a single value is one aligned double, it is read and written without lock.
+
+client example
+    table = SharedTableClient()
+    table.get("Costume")
+    table.set("Costume", 1)
+"""
+import os
+import math
+import time
+import struct
+import logging
+from array import array
+from multiprocessing import shared_memory, resource_tracker
+
+log = logging.getLogger("OSCPI")
+
+
+class SharedTableLayout:
+    MAGIC = b'OSCPISHM'
+    VERSION = 1
+    NAME_SIZE = 64
+    HEADER = struct.Struct('=8sHHIIIQI')
+    HEADER_SIZE = 64
+    # offset of count, generation, seq and owner in header
+    COUNT = 16
+    GENERATION = 20
+    SEQ = 24
+    OWNER = 32
+
+    @staticmethod
+    def attach(_name: str) -> shared_memory.SharedMemory:
+        """
+        (STATIC) open shared memory without owning it
+        :param _name: (String) shared memory name
+        :return: (SharedMemory)
+        """
+        try:
+            return shared_memory.SharedMemory(_name, track=False)
+        except TypeError:
+            # before python 3.13 the resource tracker would remove the table when this process exits
+            memory = shared_memory.SharedMemory(_name)
+            if os.name == 'posix':
+                resource_tracker.unregister(memory._name, "shared_memory")
+            return memory
+
+    @staticmethod
+    def __align(_n: int) -> int:
+        return (_n + 7) & ~7
+
+    def __init__(self, _capacity: int):
+        """
+        offsets of columns for capacity
+        :param _capacity: (Int) max number of parameters
+        """
+        self.capacity = _capacity
+
+        offset = SharedTableLayout.HEADER_SIZE
+        self.names = offset
+        offset = SharedTableLayout.__align(offset + _capacity * SharedTableLayout.NAME_SIZE)
+        self.ids = offset
+        offset = SharedTableLayout.__align(offset + _capacity * 4)
+        self.types = offset
+        offset = SharedTableLayout.__align(offset + _capacity)
+        self.values = offset
+        offset += _capacity * 8
+        self.requests = offset
+        offset += _capacity * 8
+        self.req_seq = offset
+        offset = SharedTableLayout.__align(offset + _capacity * 4)
+        self.size = offset
+
+    def columns(self, _buffer) -> dict:
+        """
+        typed views of columns
+        :param _buffer: (memoryview) shared memory buffer
+        :return: (Dictionary) column name -> memoryview
+        """
+        n = self.capacity
+        return {
+            "ids": _buffer[self.ids:self.ids + n * 4].cast('i'),
+            "types": _buffer[self.types:self.types + n].cast('B'),
+            "values": _buffer[self.values:self.values + n * 8].cast('d'),
+            "requests": _buffer[self.requests:self.requests + n * 8].cast('d'),
+            "req_seq": _buffer[self.req_seq:self.req_seq + n * 4].cast('I')
+        }
+
+
+class SharedTable:
+    def __init__(self, _name: str = "oscpi", _capacity: int = 4096):
+        """
+        Publish sheet values in shared memory (OSCPI side, only one process may own the table).
+
+        value column of the published store is the shared memory itself,
+        every store.set() is visible to clients at once without copy.
+        :param _name: (String) shared memory name
+        :param _capacity: (Int) max number of parameters
+        """
+        self.layout = SharedTableLayout(_capacity)
+
+        try:
+            self.memory = shared_memory.SharedMemory(_name, create=True, size=self.layout.size)
+        except FileExistsError:
+            SharedTable.__reclaim(_name)
+            self.memory = shared_memory.SharedMemory(_name, create=True, size=self.layout.size)
+
+        self.buffer = self.memory.buf
+        self.columns = self.layout.columns(self.buffer)
+        self.store = None
+        self.count = 0
+        self.seen = bytes()
+
+        SharedTableLayout.HEADER.pack_into(self.buffer, 0, SharedTableLayout.MAGIC, SharedTableLayout.VERSION,
+                                           SharedTableLayout.NAME_SIZE, _capacity, 0, 0, 0, os.getpid())
+        log.info("shared memory table has been created (%s, %s parameters)", _name, _capacity)
+
+    @staticmethod
+    def __reclaim(_name: str):
+        """
+        (PRIVATE STATIC) remove table left behind by OSCPI that didn't exit cleanly
+        :param _name: (String) shared memory name
+        :raise FileExistsError: shared memory is not an OSCPI table, or its owner is still running
+        :return: NONE
+        """
+        # OSCPI side only, client processes don't need psutil
+        import psutil
+
+        memory = SharedTableLayout.attach(_name)
+        try:
+            if memory.size < SharedTableLayout.HEADER.size:
+                raise FileExistsError(f"shared memory {_name} is not an OSCPI table")
+            magic, _, _, _, _, _, _, owner = SharedTableLayout.HEADER.unpack_from(memory.buf, 0)
+            if magic != SharedTableLayout.MAGIC:
+                raise FileExistsError(f"shared memory {_name} is not an OSCPI table")
+            if owner == 0 or psutil.pid_exists(owner):
+                # owner 0: table of unknown owner, it's left alone
+                raise FileExistsError(f"shared memory table {_name} is used by another OSCPI (pid {owner})")
+        finally:
+            memory.close()
+
+        # opened again, unlink() expects the table to be tracked by this process
+        stale = shared_memory.SharedMemory(_name)
+        stale.close()
+        stale.unlink()
+        log.warning("shared memory table %s of OSCPI (pid %s) that has gone has been removed", _name, owner)
+
+    def __seq(self) -> int:
+        return struct.unpack_from('=Q', self.buffer, SharedTableLayout.SEQ)[0]
+
+    def publish(self, _store):
+        """
+        publish store, its value column is moved into shared memory
+        :param _store: (PrmtStore) store of active sheet
+        :return: NONE
+        """
+        self.release()
+
+        count = len(_store)
+        if count > self.layout.capacity:
+            log.warning("sheet has %s parameters, shared memory table holds %s. table is left empty",
+                        count, self.layout.capacity)
+            count = 0
+
+        seq = self.__seq() + 1
+        struct.pack_into('=Q', self.buffer, SharedTableLayout.SEQ, seq)
+
+        size = SharedTableLayout.NAME_SIZE
+        names = bytearray(count * size)
+        for i in range(count):
+            name = _store.names[i].encode('utf-8')[:size - 1]
+            names[i * size:i * size + len(name)] = name
+        self.buffer[self.layout.names:self.layout.names + len(names)] = names
+
+        c = self.columns
+        if count > 0:
+            c["ids"][:count] = _store.ids
+            c["types"][:count] = _store.types
+            c["values"][:count] = _store.values
+            c["requests"][:count] = _store.values
+            c["req_seq"][:count] = array('I', bytes(count * 4))
+            _store.values = c["values"][:count]
+            self.store = _store
+
+        self.count = count
+        self.seen = bytes(c["req_seq"][:count])
+
+        generation = struct.unpack_from('=I', self.buffer, SharedTableLayout.GENERATION)[0] + 1
+        struct.pack_into('=II', self.buffer, SharedTableLayout.COUNT, count, generation)
+        struct.pack_into('=Q', self.buffer, SharedTableLayout.SEQ, seq + 1)
+
+    def release(self):
+        """
+        give value column back to the published store (copy out of shared memory)
+        :return: NONE
+        """
+        if self.store is not None:
+            self.store.values = array('d', self.store.values)
+            self.store = None
+
+    def poll(self) -> list:
+        """
+        get values that clients have written since last poll
+        :return: (List) (parameter index, value)
+        """
+        req_seq = self.columns["req_seq"][:self.count]
+        current = bytes(req_seq)
+        if current == self.seen:
+            return list()
+
+        seen = array('I', self.seen)
+        self.seen = current
+
+        requests = self.columns["requests"]
+        types = self.columns["types"]
+        changed = list()
+        for i, n in enumerate(array('I', current)):
+            if n == seen[i]:
+                continue
+            value = SharedTable.__check(types[i], requests[i])
+            if value is None:
+                log.warning("shared memory table: %r is not a value of %s, ignored",
+                            requests[i], self.store.names[i] if self.store is not None else i)
+                continue
+            changed.append((i, value))
+        return changed
+
+    @staticmethod
+    def __check(_type: int, _value: float):
+        """
+        (PRIVATE STATIC) fit requested value into the VRChat range of parameter type
+        :param _type: (Int) type code (0: Int, 1: Float, 2: Bool, 3: UNKNOWN)
+        :param _value: (Float) requested value
+        :return: value that can be sent, None if it can't
+        """
+        if not math.isfinite(_value):
+            return None
+        if _type == 0:
+            return float(min(max(round(_value), 0), 255))
+        elif _type == 2:
+            return 1.0 if _value != 0.0 else 0.0
+        return min(max(_value, -1.0), 1.0)
+
+    def close(self):
+        """
+        release store and remove shared memory
+        :return: NONE
+        """
+        self.release()
+        self.columns = None
+        self.buffer = None
+        self.memory.close()
+        self.memory.unlink()
+
+
+class SharedTableClient:
+    def __init__(self, _name: str = "oscpi", _timeout: float = 1.0):
+        """
+        Read and write OSCPI parameter values from another process
+        :param _name: (String) shared memory name (config.json SHARED_MEMORY.name)
+        :param _timeout: (Optional) seconds to wait for OSCPI to finish publishing a sheet
+        """
+        self.timeout = _timeout
+        self.memory = SharedTableLayout.attach(_name)
+        self.buffer = self.memory.buf
+
+        magic, version, self.name_size, capacity, _, _, _, _ = SharedTableLayout.HEADER.unpack_from(self.buffer, 0)
+        if magic != SharedTableLayout.MAGIC or version != SharedTableLayout.VERSION:
+            raise ValueError("not an OSCPI shared memory table or unsupported version")
+
+        self.layout = SharedTableLayout(capacity)
+        self.columns = self.layout.columns(self.buffer)
+        self.generation = -1
+        self.index: dict = dict()
+
+    def __read_names(self):
+        """
+        (PRIVATE) read names of current sheet (seqlock)
+        :raise TimeoutError: OSCPI has not finished publishing in time (it may have died while publishing)
+        :return: NONE
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if time.monotonic() > deadline:
+                raise TimeoutError("OSCPI shared memory table is not ready")
+
+            seq = struct.unpack_from('=Q', self.buffer, SharedTableLayout.SEQ)[0]
+            if seq % 2:
+                # publish of a large sheet takes a few milliseconds, don't spin
+                time.sleep(0.001)
+                continue
+
+            count, generation = struct.unpack_from('=II', self.buffer, SharedTableLayout.COUNT)
+            size = self.name_size
+            raw = bytes(self.buffer[self.layout.names:self.layout.names + count * size])
+
+            if struct.unpack_from('=Q', self.buffer, SharedTableLayout.SEQ)[0] == seq:
+                break
+
+        self.index = {raw[i * size:(i + 1) * size].rstrip(b'\x00').decode('utf-8', 'replace'): i for i in range(count)}
+        self.generation = generation
+
+    def __refresh(self):
+        """
+        (PRIVATE) read names again when sheet has changed
+        :return: NONE
+        """
+        if struct.unpack_from('=I', self.buffer, SharedTableLayout.GENERATION)[0] != self.generation:
+            self.__read_names()
+
+    def names(self) -> list:
+        self.__refresh()
+        return list(self.index)
+
+    def get(self, _name: str) -> float:
+        """
+        get current value
+        :param _name: (String) parameter name
+        :return: (Float) value (Bool and Int are stored as double too)
+        """
+        self.__refresh()
+        return self.columns["values"][self.index[_name]]
+
+    def set(self, _name: str, _value):
+        """
+        request new value, OSCPI applies it like a change from VRChat and sends it
+        :param _name: (String) parameter name
+        :param _value: value (Int / Float / Bool)
+        :return: NONE
+        """
+        self.__refresh()
+        i = self.index[_name]
+        self.columns["requests"][i] = float(_value)
+        req_seq = self.columns["req_seq"]
+        req_seq[i] = (req_seq[i] + 1) & 0xFFFFFFFF
+
+    def snapshot(self) -> dict:
+        """
+        get every value of current sheet
+        :return: (Dictionary) parameter name -> value
+        """
+        while True:
+            self.__refresh()
+            values = self.columns["values"][:len(self.index)].tolist()
+            if struct.unpack_from('=I', self.buffer, SharedTableLayout.GENERATION)[0] == self.generation:
+                return dict(zip(self.index, values))
+
+    def close(self):
+        self.columns = None
+        self.buffer = None
+        self.memory.close()
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tinyoscquery'))
+
+import main
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """
+    default config of OSCPI, config.json is written into a temporary directory
+    """
+    monkeypatch.chdir(tmp_path)
+    main.config = main.Config()
+    yield main.config
+    del main.config
+
+
+def make_store(_prmt: list) -> main.PrmtStore:
+    """
+    :param _prmt: (List) (name, id, type) of parameters
+    :return: (PrmtStore)
+    """
+    store = main.PrmtStore()
+    for name, id_, type_ in _prmt:
+        store.append(name, id_, type_)
+    return store
+
+
+def make_prmt(_prmt: list) -> dict:
+    """
+    :param _prmt: (List) (name, type character) of parameters
+    :return: (Dictionary) avatar parameter tree like VRChat OSCQuery answers
+    """
+    root = {'FULL_PATH': '/avatar/parameters', 'ACCESS': 0, 'CONTENTS': dict()}
+    for name, t in _prmt:
+        root['CONTENTS'][name] = {'FULL_PATH': f'/avatar/parameters/{name}', 'ACCESS': 3, 'TYPE': t}
+    return root
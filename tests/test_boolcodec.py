@@ -0,0 +1,63 @@
+import main
+from conftest import make_store
+
+
+def test_bools_are_grouped_by_eight():
+    store = make_store([(f"B{n}", n, 'Bool') for n in range(10)] + [("F", 20, 'Float')])
+    codec = main.BoolCodec(store, 224)
+
+    assert sorted(codec.groups) == [224, 225]
+    assert codec.groups[224] == [(1 << n, n) for n in range(8)]
+    assert codec.groups[225] == [(1, 8), (2, 9)]
+    assert codec.unpacked == []
+    assert codec.collisions == {}
+
+
+def test_encode_sets_bit_of_every_true_member():
+    store = make_store([(f"B{n}", n, 'Bool') for n in range(8)])
+    store.set(0, True)
+    store.set(3, True)
+    store.set(7, True)
+    codec = main.BoolCodec(store, 224)
+
+    assert main.BoolCodec.encode(store, codec.groups[224]) == 0b10001001
+
+
+def test_group_out_of_range_is_unpacked():
+    store = make_store([("B0", 0, 'Bool'), ("B200", 200, 'Bool')])
+    codec = main.BoolCodec(store, 240)
+
+    assert list(codec.groups) == [240]
+    assert codec.unpacked == [1]
+
+
+def test_group_that_collides_with_plain_id_is_unpacked():
+    # sheet ids are sequential, the 225th parameter takes the id of group 0
+    store = make_store([("B0", 0, 'Bool'), ("B1", 1, 'Bool'), ("B8", 8, 'Bool'), ("I", 224, 'Int')])
+    codec = main.BoolCodec(store, 224)
+
+    assert list(codec.groups) == [225]
+    assert codec.collisions == {224: 3}
+    assert sorted(codec.unpacked) == [0, 1]
+
+
+def test_unpacked_bools_can_collide_with_other_groups():
+    # group 252 (B225) collides with I, B225 is then sent as id 225 which collides with group 225 (B8)
+    store = make_store([("B0", 0, 'Bool'), ("B225", 225, 'Bool'), ("B8", 8, 'Bool'), ("I", 252, 'Int')])
+    codec = main.BoolCodec(store, 224)
+
+    assert codec.collisions == {252: 3, 225: 1}
+    assert codec.groups == {224: [(1, 0)]}
+    assert sorted(codec.unpacked) == [1, 2]
+
+
+def test_compile_plans_sends_colliding_bools_on_their_own(config):
+    config.bool_packing = True
+    sheet = main.DataSheet.__new__(main.DataSheet)
+    sheet.store = make_store([("B0", 0, 'Bool'), ("B8", 8, 'Bool'), ("I", 224, 'Int')])
+    sheet.compile_plans()
+
+    # B0 keeps its own frame, B8 is packed into group 225
+    assert [sheet.unit_id(u) for u in range(len(sheet.plans)) if sheet.plans[u] is not None] == [0, 224, 225]
+    assert sheet.unit_of(1) == 3
+    assert sheet.plans[0].type == 'Bool'
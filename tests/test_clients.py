@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def running(config, monkeypatch):
+    """
+    globals of a running OSCPI without receiver
+    """
+    monkeypatch.setattr(main, 'clients', dict(), raising=False)
+    monkeypatch.setattr(main, 'receiver', None, raising=False)
+    return main.clients
+
+
+def test_client_that_fails_to_load_is_removed(running, monkeypatch):
+    def load(_self):
+        raise KeyError('VALUE')
+
+    monkeypatch.setattr(main.VRChatClient, 'load', load)
+    asyncio.run(main.add_client(9000, 'VRChat-Client-1'))
+    assert running == {}
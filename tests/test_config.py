@@ -0,0 +1,13 @@
+import pytest
+
+
+def test_unknown_log_level_falls_back_to_info(config):
+    config.log_level = "VERBOSE"
+    config.validate()
+    assert config.log_level == "INFO"
+
+
+def test_malformed_lanes_are_rejected(config):
+    config.lanes = [{"prmt_id": "OSCPI/id2"}]
+    with pytest.raises(ValueError):
+        config.validate()
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+import main
+from conftest import make_prmt
+
+
+def test_unknown_parameters_create_no_sheet(config, tmp_path):
+    with pytest.raises(ValueError):
+        main.DataSheet('Avatar', str(tmp_path / 'sheets'), None)
+    assert not os.path.exists(tmp_path / 'sheets' / 'Avatar.csv')
+
+
+def test_clients_on_same_avatar_share_journal(config, tmp_path):
+    path = str(tmp_path / 'sheets')
+    prmt = make_prmt([('A', 'f'), ('B', 'i')])
+    first = main.DataSheet('Avatar', path, prmt)
+    second = main.DataSheet('Avatar', path, prmt)
+    assert first.journal.lock is second.journal.lock
+
+    first.store.set(0, 0.5)
+    first.journal.record(0)
+    rows = first.journal.take(first.store)
+    second.store.set(1, 3)
+    second.journal.record(1)
+    first.journal.write(rows)
+    second.journal.flush(second.store)
+    assert second.journal.taken == rows[0][2] + 1
+
+    # rows of the other client taken after the snapshot stay in the journal
+    first.journal.compact(first.snapshot(), rows[0][2])
+    reopened = main.DataSheet('Avatar', path, prmt)
+    assert reopened.store.get(0) == 0.5
+    assert reopened.store.get(1) == 3
+
+
+def test_convert_carries_journal(config, tmp_path):
+    path = str(tmp_path / 'sheets')
+    config.sheet_format = 'binary'
+    sheet = main.DataSheet('Avatar', path, make_prmt([('A', 'f'), ('B', 'i')]))
+    sheet.store.set(1, 7)
+    sheet.journal.record(1)
+    sheet.journal.flush(sheet.store)
+
+    assert main.DataSheet.convert('Avatar', path, False) == 0
+    assert main.DataSheet.read_csv(os.path.join(path, 'Avatar.csv')).get(1) == 7
+
+    assert main.DataSheet.convert('Avatar', path, True) == 0
+    assert not os.path.exists(os.path.join(path, 'Avatar.journal'))
+    assert main.DataSheet.read_binary(os.path.join(path, 'Avatar.bsheet')).get(1) == 7
@@ -0,0 +1,74 @@
+import pytest
+
+import main
+from conftest import make_store
+
+
+def sample_store() -> main.PrmtStore:
+    store = make_store([("Costume", 1, 'Int'), ("Hue", 2, 'Float'), ("Hat", 3, 'Bool'), ("이름", 4, 'Float')])
+    store.set(0, 7)
+    store.set(1, 0.25)
+    store.set(2, True)
+    store.defaults[1] = -0.5
+    store.classes[0] = main.PrmtStore.CLASSES.index(main.RefreshClass.Hot)
+    return store
+
+
+def test_pack_unpack_round_trip():
+    store = sample_store()
+    loaded = main.PrmtStore.unpack(store.pack())
+
+    assert loaded.names == store.names
+    assert loaded.index == store.index
+    for column in ('ids', 'types', 'classes', 'values', 'defaults'):
+        assert getattr(loaded, column) == getattr(store, column)
+    assert [loaded.get(i) for i in range(len(loaded))] == [7, 0.25, True, 0.0]
+    assert loaded.refresh_class(0) == main.RefreshClass.Hot
+
+
+def test_empty_store_round_trip():
+    loaded = main.PrmtStore.unpack(main.PrmtStore().pack())
+    assert len(loaded) == 0
+
+
+def test_truncated_sheet_is_rejected():
+    data = sample_store().pack()
+    for size in (0, 10, len(data) - 1, len(data) - 8 * 4):
+        with pytest.raises(ValueError):
+            main.PrmtStore.unpack(data[:size])
+
+
+def test_name_count_mismatch_is_rejected():
+    data = bytearray(sample_store().pack())
+    # count field of header
+    data[12:16] = (5).to_bytes(4, 'little')
+    with pytest.raises(ValueError, match="names"):
+        main.PrmtStore.unpack(bytes(data))
+
+
+def test_not_a_sheet_is_rejected():
+    with pytest.raises(ValueError):
+        main.PrmtStore.unpack(b'NOTSHEET' + bytes(64))
+
+
+def test_read_binary_names_broken_file(tmp_path):
+    file = tmp_path / "broken.bsheet"
+    file.write_bytes(sample_store().pack()[:-3])
+    with pytest.raises(ValueError, match="broken.bsheet"):
+        main.DataSheet.read_binary(str(file))
+
+
+def test_unknown_type_text_is_kept():
+    store = make_store([("Hue", 1, 'Float'), ("Name", 2, 's'), ("Other", 3, 'UNKNOWN')])
+    assert store.type(1) == 's'
+    assert store.type(2) == 'UNKNOWN'
+
+    loaded = main.PrmtStore.unpack(store.pack())
+    assert [loaded.type(i) for i in range(len(loaded))] == ['Float', 's', 'UNKNOWN']
+
+
+def test_unknown_type_text_survives_csv(tmp_path):
+    file = str(tmp_path / "sheet.csv")
+    main.DataSheet.write_rows(main.DataSheet.store_rows(make_store([("Name", 1, 'ff')])), file)
+
+    assert main.DataSheet.read_csv(file).type(0) == 'ff'
@@ -0,0 +1,91 @@
+import pytest
+
+import main
+from conftest import make_store
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(main.time, 'monotonic', clock)
+    return clock
+
+
+def make_sheet(_classes: list) -> main.DataSheet:
+    sheet = main.DataSheet.__new__(main.DataSheet)
+    sheet.store = make_store([(f"P{n}", n + 1, 'Float') for n in range(len(_classes))])
+    for i, c in enumerate(_classes):
+        sheet.store.classes[i] = main.PrmtStore.CLASSES.index(c)
+    sheet.compile_plans()
+    return sheet
+
+
+def drain(_scheduler):
+    while _scheduler.next() is not None:
+        pass
+
+
+def test_changes_go_first_in_class_order(config, clock):
+    config.coalesce_window = 0
+    sheet = make_sheet([main.RefreshClass.Cold, main.RefreshClass.Normal, main.RefreshClass.Hot])
+    scheduler = main.Scheduler(sheet)
+    drain(scheduler)
+
+    for i in (0, 1, 2):
+        scheduler.mark_dirty(i)
+    order = [scheduler.next() for _ in range(3)]
+
+    assert order == [2, 1, 0]
+    assert scheduler.keepalive is False
+    assert scheduler.next() is None
+
+
+def test_busy_hot_parameter_does_not_starve_cold_change(config, clock):
+    config.coalesce_window = 0
+    sheet = make_sheet([main.RefreshClass.Hot, main.RefreshClass.Cold])
+    scheduler = main.Scheduler(sheet)
+    drain(scheduler)
+
+    scheduler.mark_dirty(1)
+    sent = list()
+    for _ in range(40):
+        clock.now += config.frame_interval
+        # hot parameter changes every frame
+        scheduler.mark_dirty(0)
+        sent.append(scheduler.next())
+
+    aging = main.Scheduler.AGING[main.RefreshClass.Cold]
+    assert 1 in sent
+    assert sent.index(1) <= aging + 1
+
+
+def test_coalesced_change_is_deferred(config, clock):
+    config.coalesce_window = 0.2
+    sheet = make_sheet([main.RefreshClass.Normal])
+    scheduler = main.Scheduler(sheet)
+    drain(scheduler)
+
+    assert scheduler.mark_dirty(0) is True
+    assert scheduler.next() is None
+    assert scheduler.mark_dirty(0) is False
+
+    clock.now += 0.2
+    assert scheduler.next() == 0
+    assert scheduler.keepalive is False
+
+
+def test_pacer_interval_stays_below_pacing_max(config, clock):
+    config.pacing = True
+    pacer = main.Pacer()
+    pacer.sent(1)
+    clock.now += config.pacing_max * 4
+    pacer.echo(1)
+    assert pacer.delay() == config.pacing_max
@@ -0,0 +1,64 @@
+import main
+
+
+def test_same_key_is_replaced_in_place():
+    sender = main.Sender(_queue_size=4)
+    sender.send(1, "A", PRINT_INFO=False)
+    sender.send(2, "B", PRINT_INFO=False)
+    sender.send(3, "A", PRINT_INFO=False)
+
+    assert [item[1] for item, _ in sender.queue.values()] == [3, 2]
+
+
+def test_full_queue_drops_keepalive_first():
+    sender = main.Sender(_queue_size=3)
+    plans = [main.SendPlan.__new__(main.SendPlan) for _ in range(3)]
+    sender.send_frame(plans[0], 1, PRINT_INFO=False)
+    sender.send_frame(plans[1], 2, _keepalive=True, PRINT_INFO=False)
+    sender.send_frame(plans[2], 3, PRINT_INFO=False)
+    sender.send(4, "A", PRINT_INFO=False)
+
+    assert list(sender.queue) == [plans[0], plans[2], "/avatar/parameters/A"]
+
+
+def test_full_queue_drops_oldest_without_keepalive():
+    sender = main.Sender(_queue_size=2)
+    for n, name in enumerate("ABC"):
+        sender.send(n, name, PRINT_INFO=False)
+
+    assert list(sender.queue) == ["/avatar/parameters/B", "/avatar/parameters/C"]
+
+
+def test_change_of_keepalive_item_is_not_keepalive():
+    sender = main.Sender(_queue_size=2)
+    plan = main.SendPlan.__new__(main.SendPlan)
+    sender.send_frame(plan, 1, _keepalive=True, PRINT_INFO=False)
+    sender.send_frame(plan, 2, PRINT_INFO=False)
+
+    assert sender.queue[plan][1] is False
+
+
+class FailingSocket:
+    def __init__(self, _failures: int):
+        self.failures = _failures
+        self.sent = list()
+
+    def sendto(self, _data, _address):
+        if self.failures > 0:
+            self.failures -= 1
+            raise BlockingIOError(11, "Resource temporarily unavailable")
+        self.sent.append(bytes(_data))
+
+
+def test_frame_stops_at_first_refused_datagram(config):
+    sender = main.Sender()
+    sender.socket = FailingSocket(1)
+    plan = main.SendPlan(7, 'Float')
+
+    assert sender.send_plan(plan, 0.5, PRINT_INFO=False) is False
+    # value was refused, light and id must not go out alone
+    assert sender.socket.sent == []
+
+    assert sender.send_plan(plan, 0.5, PRINT_INFO=False) is True
+    assert [bytes(m) for m in plan.messages] == sender.socket.sent
+    assert sender.socket.sent[-1].startswith(main.SendPlan.osc_string("/avatar/parameters/" + config.prmt_id))
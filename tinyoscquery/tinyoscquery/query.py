@@ -6,9 +6,13 @@ from .shared.node import OSCQueryNode, OSC_Type_String_to_Python_Type, OSCAccess
 
 class OSCQueryListener(ServiceListener):
 
-    def __init__(self) -> None:
+    def __init__(self, callback=None, removed=None) -> None:
         self.osc_services = {}
         self.oscjson_services = {}
+        # called as callback(type_, name, service_info) from the zeroconf thread
+        self.callback = callback
+        # called as removed(type_, name) from the zeroconf thread
+        self.removed = removed
 
         super().__init__()
 
@@ -19,23 +23,35 @@ class OSCQueryListener(ServiceListener):
         if name in self.oscjson_services:
             del self.oscjson_services[name]
 
+        if self.removed is not None:
+            self.removed(type_, name)
+
     def add_service(self, zc: 'Zeroconf', type_: str, name: str) -> None:
         if type_ == '_osc._udp.local.':
             self.osc_services[name] = zc.get_service_info(type_, name)
+            self._notify(type_, name, self.osc_services[name])
         elif type_ == '_oscjson._tcp.local.':
             self.oscjson_services[name] = zc.get_service_info(type_, name)
+            self._notify(type_, name, self.oscjson_services[name])
 
     def update_service(self, zc: 'Zeroconf', type_: str, name: str) -> None:
         if type_ == '_osc._udp.local.':
             self.osc_services[name] = zc.get_service_info(type_, name)
+            self._notify(type_, name, self.osc_services[name])
         elif type_ == '_oscjson._tcp.local.':
             self.oscjson_services[name] = zc.get_service_info(type_, name)
+            self._notify(type_, name, self.oscjson_services[name])
+
+    def _notify(self, type_: str, name: str, service_info) -> None:
+        if self.callback is not None and service_info is not None:
+            self.callback(type_, name, service_info)
 
 
 class OSCQueryBrowser(object):
-    def __init__(self) -> None:
-        self.listener = OSCQueryListener()
-        self.zc = Zeroconf()
+    def __init__(self, callback=None, zeroconf=None, removed=None) -> None:
+        self.listener = OSCQueryListener(callback, removed)
+        # share one zeroconf instance with OSCQueryService instead of starting another one
+        self.zc = zeroconf if zeroconf is not None else Zeroconf()
         self.browser = ServiceBrowser(self.zc, ["_oscjson._tcp.local.", "_osc._udp.local."], self.listener)
 
     def get_discovered_osc(self):
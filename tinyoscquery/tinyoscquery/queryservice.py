@@ -16,9 +16,11 @@ class OSCQueryService(object):
         Desired TCP port number for the oscjson HTTP server
     oscPort : int
         Desired UDP port number for the osc server
+    zeroconf : Zeroconf
+        (optional) running zeroconf instance to register with, a new one is started if None
     """
     
-    def __init__(self, serverName, httpPort, oscPort, oscIp="127.0.0.1") -> None:
+    def __init__(self, serverName, httpPort, oscPort, oscIp="127.0.0.1", zeroconf=None) -> None:
         self.serverName = serverName
         self.httpPort = httpPort
         self.oscPort = oscPort
@@ -28,7 +30,7 @@ class OSCQueryService(object):
         self.host_info = OSCHostInfo(serverName, {"ACCESS":True,"CLIPMODE":False,"RANGE":True,"TYPE":True,"VALUE":True}, 
             self.oscIp, self.oscPort, "UDP")
 
-        self._zeroconf = Zeroconf()
+        self._zeroconf = zeroconf if zeroconf is not None else Zeroconf()
         self._startOSCQueryService()
         self._advertiseOSCService()
         self.http_server = OSCQueryHTTPServer(self.root_node, self.host_info, ('', self.httpPort), OSCQueryHTTPHandler)
@@ -52,6 +54,14 @@ class OSCQueryService(object):
                 new_node.type_ = [type(v) for v in value]
         self.add_node(new_node)
 
+    def add_route(self, path, callback):
+        """
+        Serve a non OSC path from the oscjson http server.
+
+        callback is called on the http server thread for every GET of path and returns (content_type, body).
+        """
+        self.http_server.routes[path] = callback
+
     def _startOSCQueryService(self):
         oscqsDesc = {'txtvers': 1}
         oscqsInfo = ServiceInfo("_oscjson._tcp.local.", "%s._oscjson._tcp.local." % self.serverName, self.httpPort, 
@@ -75,10 +85,19 @@ class OSCQueryHTTPServer(HTTPServer):
         super().__init__(server_address, RequestHandlerClass, bind_and_activate)
         self.root_node = root_node
         self.host_info = host_info
+        self.routes = {}
 
 
 class OSCQueryHTTPHandler(SimpleHTTPRequestHandler):
     def do_GET(self) -> None:
+        route = self.server.routes.get(self.path.split('?')[0])
+        if route is not None:
+            content_type, body = route()
+            self.send_response(200)
+            self.send_header("Content-type", content_type)
+            self.end_headers()
+            self.wfile.write(bytes(body, 'utf-8'))
+            return
         if 'HOST_INFO' in self.path:
             self.send_response(200)
             self.send_header("Content-type", "text/json")